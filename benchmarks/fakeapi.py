@@ -0,0 +1,171 @@
+import time
+import json
+import random
+import asyncio
+import hashlib
+
+from collections import Counter
+from urllib.parse import unquote
+
+from aiohttp import web
+
+
+class FakeAPI():
+    """ Local stand-in for label and repository endpoints of GitHub and GitLab APIs. \
+        Serves GitHub under / (REST and GraphQL) and GitLab under /api/v4.
+        Supports latency, pagination with Link and X-Total-Pages headers, ETags,
+        rate limit headers and injection of failed responses. """
+
+    def __init__(self, repos=10, labels=5, latency=0.0, rate_limit=None, error_rate=0.0, error_status=500, seed=0):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._random = random.Random(seed)
+        self._remaining = rate_limit
+        self._reset_at = time.time() + 3600
+
+        self.repos = {
+            f'org/repo{i}': {
+                f'label{j}': {'name': f'label{j}', 'color': 'ededed', 'description': f'Label {j}'}
+                for j in range(labels)
+            }
+            for i in range(repos)
+        }
+        self.requests = Counter()
+
+    def reset_counters(self):
+        self.requests.clear()
+
+    def _page(self, request, items):
+        """ Returns one page of items with pagination headers. """
+        per_page = min(int(request.query.get('per_page', 30)), 100)
+        page = int(request.query.get('page', 1))
+        pages = max(1, (len(items) + per_page - 1) // per_page)
+        body = json.dumps(items[(page - 1) * per_page:page * per_page])
+
+        links = []
+        if page < pages:
+            links.append(f'<{request.url.update_query(page=page + 1)}>; rel="next"')
+        links.append(f'<{request.url.update_query(page=pages)}>; rel="last"')
+        headers = {'Link': ', '.join(links)}
+        if request.path.startswith('/api/v4'):
+            headers['X-Total-Pages'] = str(pages)
+        headers['ETag'] = '"' + hashlib.md5((body + headers['Link']).encode()).hexdigest() + '"'
+        if request.headers.get('If-None-Match') == headers['ETag']:
+            return web.Response(status=304, headers=headers)
+        return web.Response(text=body, content_type='application/json', headers=headers)
+
+    def _rate_limit_headers(self):
+        if self.rate_limit is None:
+            return {}
+        if time.time() >= self._reset_at:
+            self._remaining = self.rate_limit
+            self._reset_at = time.time() + 3600
+        self._remaining = max(0, self._remaining - 1)
+        return {
+            'X-RateLimit-Limit': str(self.rate_limit),
+            'X-RateLimit-Remaining': str(self._remaining),
+            'X-RateLimit-Reset': str(int(self._reset_at))
+        }
+
+    async def handle(self, request):
+        self.requests[request.method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.error_rate and self._random.random() < self.error_rate:
+            resp = web.Response(status=self.error_status)
+            if self.error_status == 429:
+                resp.headers['Retry-After'] = '1'
+            return resp
+        if self._remaining == 0 and time.time() < self._reset_at:
+            return web.Response(status=403, text='API rate limit exceeded', headers=self._rate_limit_headers())
+
+        resp = await self._dispatch(request)
+        resp.headers.update(self._rate_limit_headers())
+        return resp
+
+    async def _dispatch(self, request):
+        path = unquote(request.path)
+        parts = path.strip('/').split('/')
+        if path == '/graphql':
+            return await self._graphql(request)
+        if path == '/user/repos':
+            return self._page(request, [{'full_name': reposlug} for reposlug in self.repos])
+        if path == '/api/v4/projects':
+            return self._page(request, [{'path_with_namespace': reposlug} for reposlug in self.repos])
+
+        if parts[0] == 'repos':
+            reposlug, rest = '/'.join(parts[1:3]), parts[3:]
+        else:
+            reposlug, rest = '/'.join(parts[3:5]), parts[5:]
+        labels = self.repos.get(reposlug)
+        if labels is None or not rest or rest[0] != 'labels':
+            return web.Response(status=404)
+
+        if len(rest) == 1:
+            if request.method == 'GET':
+                items = list(labels.values())
+                if parts[0] == 'api':
+                    items = [dict(label, is_project_label=True) for label in items]
+                return self._page(request, items)
+            data = await request.json()
+            labels[data['name']] = {
+                'name': data['name'],
+                'color': data['color'].lstrip('#'),
+                'description': data['description']
+            }
+            return web.json_response(labels[data['name']], status=201)
+
+        name = rest[1]
+        if name not in labels:
+            return web.Response(status=404)
+        if request.method == 'DELETE':
+            del labels[name]
+            return web.Response(status=204)
+        if request.method in ('PATCH', 'PUT'):
+            data = await request.json()
+            label = labels.pop(name)
+            label.update(
+                name=data.get('new_name') or name,
+                color=data['color'].lstrip('#'),
+                description=data['description']
+            )
+            labels[label['name']] = label
+            return web.json_response(label)
+        return web.json_response(labels[name])
+
+    async def _graphql(self, request):
+        variables = (await request.json())['variables']
+        data = {}
+        errors = []
+        index = 0
+        while f'r{index}_owner' in variables:
+            alias = f'r{index}'
+            index += 1
+            reposlug = variables[f'{alias}_owner'] + '/' + variables[f'{alias}_name']
+            if reposlug not in self.repos:
+                data[alias] = None
+                errors.append({'path': [alias], 'message': 'Could not resolve to a Repository'})
+                continue
+            items = list(self.repos[reposlug].values())
+            start = int(variables[f'{alias}_cursor'] or 0)
+            data[alias] = {'labels': {
+                'nodes': items[start:start + 100],
+                'pageInfo': {'hasNextPage': start + 100 < len(items), 'endCursor': str(start + 100)}
+            }}
+        return web.json_response({'data': data, 'errors': errors} if errors else {'data': data})
+
+    async def start(self, host='127.0.0.1', port=0):
+        """ Starts serving and returns base URL of the server. """
+        app = web.Application()
+        app.router.add_route('*', '/{tail:.*}', self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f'http://{host}:{port}'
+
+    async def stop(self):
+        await self._runner.cleanup()
@@ -0,0 +1,170 @@
+""" Benchmarks of Labelatory against a local fake GitHub/GitLab API. \
+    Runs get_repos, check_all, fix_all and webhook processing for growing numbers
+    of repositories and reports wall time, API requests and peak memory.
+
+    python -m benchmarks.run --repos 10,100,1000 --services github,gitlab --latency 0.01 """
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+from labelatory.label import Label
+from labelatory.loop import BackgroundLoop
+from labelatory.pool import ConnectionPool
+from labelatory.ratelimit import RateLimiter
+from labelatory.rules import RuleIndex
+from labelatory.webhooks import WebhookQueue
+from labelatory.connector import GitHubConnector, GitLabConnector
+from labelatory.services import GitHubService, GitLabService
+
+from .fakeapi import FakeAPI
+
+
+def make_rules(labels):
+    """ Returns rules which every fake repository violates in a few ways: \
+        one label has another color, one is extra and one rule is missing. """
+    rules = {
+        f'label{j}': Label(f'label{j}', 'ededed', f'Label {j}')
+        for j in range(labels - 1)
+    }
+    rules['label0'] = Label('label0', '#d73a4a', 'Label 0')
+    rules['missing'] = Label('missing', '#0e8a16', 'Missing label')
+    return RuleIndex(rules)
+
+
+def make_service(name, base_url, reposlugs, concurrency):
+    repos = dict.fromkeys(reposlugs, True)
+    pool = ConnectionPool(limit=concurrency * 2, limit_per_host=concurrency * 2)
+    if name == 'github':
+        connector = GitHubConnector('token', limiter=RateLimiter())
+        connector.API_ENDPOINT = base_url + '/'
+        return GitHubService(name, 'token', 'secret', repos, connector=connector, concurrency=concurrency, pool=pool)
+    connector = GitLabConnector('127.0.0.1', 'token', limiter=RateLimiter())
+    connector.api_url = base_url + '/api/v4'
+    return GitLabService(name, 'token', 'secret', repos, connector=connector, concurrency=concurrency, pool=pool)
+
+
+class Measure():
+    """ Measures wall time, API requests and peak traced memory of one step. """
+
+    def __init__(self, fake):
+        self.fake = fake
+
+    def __enter__(self):
+        self.fake.reset_counters()
+        tracemalloc.reset_peak()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._started
+        self.peak = tracemalloc.get_traced_memory()[1]
+        self.requests = dict(self.fake.requests)
+
+
+def run_scenario(loop, service_name, repos, args):
+    fake = FakeAPI(
+        repos=repos,
+        labels=args.labels,
+        latency=args.latency,
+        rate_limit=args.rate_limit,
+        error_rate=args.error_rate,
+        error_status=args.error_status
+    )
+    base_url = loop.run(fake.start())
+    service = make_service(service_name, base_url, list(fake.repos), args.concurrency)
+    service.loop = loop
+    rules = make_rules(args.labels)
+    results = []
+
+    def record(step, measure, items, **extra):
+        result = {
+            'service': service_name,
+            'repos': repos,
+            'step': step,
+            'seconds': round(measure.seconds, 3),
+            'per_second': round(items / measure.seconds, 1) if measure.seconds else None,
+            'requests': sum(measure.requests.values()),
+            'by_method': measure.requests,
+            'peak_mib': round(measure.peak / 2 ** 20, 2)
+        }
+        result.update(extra)
+        results.append(result)
+
+    try:
+        with Measure(fake) as measure:
+            found = service.run(service.get_repos())
+        record('get_repos', measure, repos, found=len(found))
+
+        with Measure(fake) as measure:
+            _, checked = service.run(service.check_all(rules))
+        record('check_all', measure, repos, errors=sum(isinstance(v, Exception) for v in checked.values()))
+
+        with Measure(fake) as measure:
+            _, fixed = service.run(service.fix_all(rules, checked))
+        record('fix_all', measure, repos, errors=sum(isinstance(v, Exception) for v in fixed.values()))
+
+        # Every repository receives an event about label which drifted again
+        for labels in fake.repos.values():
+            labels['label1']['color'] = '000000'
+        queue = WebhookQueue(workers=args.workers, window=0)
+        queue.start(loop, [service], lambda: rules)
+        service.queue = queue
+        with Measure(fake) as measure:
+            for reposlug in fake.repos:
+                queue.put(service, {
+                    'repository': reposlug,
+                    'action': 'edited',
+                    'labels': [{'name': 'label1', 'color': '000000', 'description': 'Label 1'}]
+                })
+            loop.run(queue.join())
+        record('webhooks', measure, repos)
+        loop.run(queue.stop())
+    finally:
+        loop.run(service.pool.close())
+        loop.run(fake.stop())
+    return results
+
+
+def print_table(results):
+    columns = ('service', 'repos', 'step', 'seconds', 'per_second', 'requests', 'peak_mib')
+    print(' '.join(f'{column:>10}' for column in columns))
+    for result in results:
+        print(' '.join(f'{str(result[column]):>10}' for column in columns))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks Labelatory against a local fake API.')
+    parser.add_argument('--repos', default='10,100,1000,10000', help='comma separated numbers of repositories')
+    parser.add_argument('--services', default='github,gitlab', help='comma separated services')
+    parser.add_argument('--labels', type=int, default=10, help='labels per repository')
+    parser.add_argument('--latency', type=float, default=0.005, help='seconds added to every response')
+    parser.add_argument('--concurrency', type=int, default=10, help='repositories processed at the same time')
+    parser.add_argument('--workers', type=int, default=4, help='webhook workers')
+    parser.add_argument('--rate-limit', type=int, default=None, help='requests allowed per hour')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of failed responses')
+    parser.add_argument('--error-status', type=int, default=500, help='status of failed responses')
+    parser.add_argument('--json', action='store_true', help='print results as JSON lines')
+    args = parser.parse_args(argv)
+
+    loop = BackgroundLoop('labelatory-benchmark')
+    tracemalloc.start()
+    results = []
+    try:
+        for repos in (int(value) for value in args.repos.split(',')):
+            for service_name in args.services.split(','):
+                scenario = run_scenario(loop, service_name, repos, args)
+                results.extend(scenario)
+                if args.json:
+                    for result in scenario:
+                        print(json.dumps(result))
+                    sys.stdout.flush()
+    finally:
+        loop.stop()
+    if not args.json:
+        print_table(results)
+
+
+if __name__ == '__main__':
+    main()
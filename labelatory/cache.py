@@ -0,0 +1,57 @@
+from collections import OrderedDict
+
+
+class ResponseCache():
+    """ Remembers GET responses with their ETag / Last-Modified validators. \
+        Connectors send conditional requests with the validators and reuse
+        the stored response when the API answers 304 Not Modified. """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._responses = OrderedDict()
+        self._parsed = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(url, params=None):
+        return (str(url), tuple(sorted((params or {}).items())))
+
+    def _put(self, entries, key, value):
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def conditional_headers(self, key):
+        """ Returns headers making the request conditional on the stored response. """
+        resp = self._responses.get(key)
+        if resp is None:
+            return {}
+        headers = {}
+        if resp.headers.get('ETag'):
+            headers['If-None-Match'] = resp.headers['ETag']
+        if resp.headers.get('Last-Modified'):
+            headers['If-Modified-Since'] = resp.headers['Last-Modified']
+        return headers
+
+    def get(self, key):
+        """ Returns stored response, used once the API confirmed it is not modified. """
+        resp = self._responses.get(key)
+        if resp is not None:
+            self.hits += 1
+            self._responses.move_to_end(key)
+        return resp
+
+    def store(self, key, resp):
+        """ Stores response if it carries any validator. """
+        self.misses += 1
+        if resp.headers.get('ETag') or resp.headers.get('Last-Modified'):
+            self._put(self._responses, key, resp)
+
+    def get_parsed(self, key):
+        """ Returns objects parsed from unchanged listing. """
+        return self._parsed.get(key)
+
+    def store_parsed(self, key, value):
+        self._put(self._parsed, key, value)
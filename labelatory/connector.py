@@ -1,12 +1,34 @@
-import json
-import requests
+import re
+import time
+import asyncio
 import aiohttp
 
+from . import metrics
+from . import tracing
 from .label import Label
+from .ratelimit import RateLimiter
+from .cache import ResponseCache
+from .retry import RetryPolicy, CircuitBreaker
+from .errors import APIError, NotFoundError, RateLimitError, TransientError, from_status
 from abc import ABCMeta, abstractmethod
+from collections import namedtuple
+from urllib.parse import urlsplit, parse_qs
+
+
+Response = namedtuple('Response', ['status', 'headers', 'links', 'data', 'cached'], defaults=(False,))
 
 class DefaultConnector(metaclass=ABCMeta):
-    def __init__(self, token=None, session=None):
+
+    # Name of the service in metrics
+    SERVICE = 'default'
+
+    # (pattern, template) of API paths, so metrics are not split per repository
+    ENDPOINTS = ()
+
+    # How many times a request rejected by rate limit is repeated
+    RATE_LIMIT_RETRIES = 3
+
+    def __init__(self, token=None, session=None, limiter=None, cache=None, retry=None):
         # self.user = user
         # self.repo = repo
         self.token = token
@@ -15,6 +37,181 @@ class DefaultConnector(metaclass=ABCMeta):
             'Authorization': f'token {token}'
         }
         self.session = session # aiohttp.ClientSession(headers=headers)
+        self.limiter = limiter or RateLimiter()
+        self.cache = cache if cache is not None else ResponseCache()
+        self.retry = retry or RetryPolicy()
+        # Circuit breakers per host
+        self._breakers = {}
+
+    def _endpoint(self, url):
+        """ Returns template of the API endpoint of the url. """
+        path = urlsplit(str(url)).path
+        for pattern, template in self.ENDPOINTS:
+            if pattern.search(path):
+                return template
+        return 'other'
+
+    def _breaker(self, url):
+        host = urlsplit(str(url)).netloc
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(host, self.retry.circuit_threshold, self.retry.circuit_reset)
+            self._breakers[host] = breaker
+        return breaker
+
+    async def _request(self, method, url, expected=(200,), limiter=None, idempotent=None, **kwargs):
+        """ Sends request with the connector session and returns its parsed response. \
+            Requests are scheduled by the rate limiter and repeated when rejected by rate limit.
+            Transient failures are repeated by the retry policy, `idempotent` marks POST requests
+            which only read. Failures raise APIError subclasses.
+            GET requests are conditional on the cached response, which is reused on 304. """
+        endpoint = self._endpoint(url)
+        breaker = self._breaker(url)
+        with tracing.span('http', service=self.SERVICE, method=method, endpoint=endpoint, url=str(url)) as span:
+            page = (kwargs.get('params') or {}).get('page')
+            if page:
+                span.set_attribute('page', page)
+            attempt = 0
+            while True:
+                breaker.before_request()
+                sent = True
+                try:
+                    response = await self._send(method, url, expected, limiter or self.limiter, endpoint, **kwargs)
+                except APIError as e:
+                    error = e
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    # Request which failed to connect surely did not reach the server
+                    sent = not isinstance(e, aiohttp.ClientConnectorError)
+                    error = TransientError(str(e) or type(e).__name__, None, method, str(url))
+                except BaseException:
+                    # Cancelled or unparsable request tells nothing about the host
+                    breaker.release()
+                    raise
+                else:
+                    breaker.success()
+                    span.set_attribute('status', response.status)
+                    span.set_attribute('cached', response.cached)
+                    span.set_attribute('attempts', attempt + 1)
+                    return response
+
+                if error.retryable:
+                    breaker.failure()
+                else:
+                    # Host answered, so it is healthy even though the request failed
+                    breaker.success()
+                if not self.retry.should_retry(method, error, attempt, idempotent, sent):
+                    span.set_attribute('attempts', attempt + 1)
+                    raise error
+                metrics.API_RETRIES.inc(service=self.SERVICE, endpoint=endpoint, reason='transient')
+                await asyncio.sleep(self.retry.delay(attempt))
+                attempt += 1
+
+    async def _send(self, method, url, expected, limiter, endpoint, **kwargs):
+        """ Sends request once, repeating it only while it is rejected by rate limit. """
+        cache_key = None
+        if method == 'GET' and self.cache is not None:
+            cache_key = self.cache.key(url, kwargs.get('params'))
+            conditional = self.cache.conditional_headers(cache_key)
+            if conditional:
+                kwargs['headers'] = {**kwargs.get('headers', {}), **conditional}
+
+        for attempt in range(self.RATE_LIMIT_RETRIES + 1):
+            with tracing.span('rate_limit.wait', attempt=attempt), metrics.RATE_LIMIT_WAIT.time(service=self.SERVICE):
+                await limiter.acquire()
+            started = time.perf_counter()
+            try:
+                resp = await self.session.request(method, url, **kwargs)
+            except Exception:
+                metrics.API_REQUESTS.inc(service=self.SERVICE, method=method, endpoint=endpoint, status='error')
+                raise
+            finally:
+                # Time until headers of the response arrived
+                metrics.API_DURATION.observe(
+                    time.perf_counter() - started, service=self.SERVICE, method=method, endpoint=endpoint
+                )
+            metrics.API_REQUESTS.inc(service=self.SERVICE, method=method, endpoint=endpoint, status=resp.status)
+            async with resp:
+                limiter.update(resp.headers)
+                if resp.status == 304 and cache_key:
+                    cached = self.cache.get(cache_key)
+                    if cached:
+                        return cached._replace(cached=True)
+                if resp.status not in expected:
+                    text = await resp.text() if resp.status == 403 else ''
+                    if limiter.is_limited(resp.status, resp.headers, text):
+                        if attempt < self.RATE_LIMIT_RETRIES:
+                            limiter.backoff(resp.headers, attempt)
+                            metrics.API_RETRIES.inc(service=self.SERVICE, endpoint=endpoint, reason='rate_limit')
+                            continue
+                        raise RateLimitError(resp.reason, resp.status, method, str(url))
+                    raise from_status(resp.status, resp.reason, method, str(url))
+                data = None
+                if resp.status != 204:
+                    data = await resp.json()
+                links = {rel: str(link['url']) for rel, link in resp.links.items()}
+                response = Response(resp.status, resp.headers, links, data)
+                if cache_key:
+                    self.cache.store(cache_key, response)
+                return response
+
+    @staticmethod
+    def _total_pages(resp):
+        """ Returns number of pages reported by the API or None if it is unknown. """
+        total = resp.headers.get('X-Total-Pages')
+        if total:
+            return int(total)
+        last = resp.links.get('last')
+        if last:
+            page = parse_qs(urlsplit(last).query).get('page')
+            if page:
+                return int(page[0])
+        return None
+
+    async def _get_pages(self, url, params=None):
+        """ Retrieves items of all pages of the listing. \
+            When the first page tells the number of pages, the rest are fetched concurrently,
+            otherwise 'next' links are followed one by one.
+            Returns the items and whether any page has changed since it was cached. """
+        params = dict(params or {})
+        first = await self._request('GET', url, params=params)
+        items = list(first.data)
+        modified = not first.cached
+
+        total = self._total_pages(first)
+        if total:
+            pages = await asyncio.gather(*[
+                self._request('GET', url, params={**params, 'page': page})
+                for page in range(2, total + 1)
+            ])
+            for page in pages:
+                items.extend(page.data)
+                modified = modified or not page.cached
+            return items, modified
+
+        next_url = first.links.get('next')
+        while next_url:
+            page = await self._request('GET', next_url)
+            items.extend(page.data)
+            modified = modified or not page.cached
+            next_url = page.links.get('next')
+        return items, modified
+
+    async def _get_labels(self, url, params):
+        """ Retrieves all labels of the listing. \
+            Labels parsed before are reused when no page of the listing has changed. """
+        page, modified = await self._get_pages(url, params)
+        key = ResponseCache.key(url, params)
+        labels = self.cache.get_parsed(key) if self.cache is not None and not modified else None
+        if labels is None:
+            labels = [self._parse_label(label) for label in page]
+            if self.cache is not None:
+                self.cache.store_parsed(key, labels)
+        # Labels are immutable, the cached ones can be shared
+        return list(labels)
+
+    def _parse_label(self, label):
+        """ Creates Label from label returned by the API. """
+        return Label(label['name'], label['color'], label['description'])
 
     @abstractmethod
     def get_repos(self):
@@ -51,71 +248,122 @@ class GitHubConnector(DefaultConnector):
     
     API_ENDPOINT = 'https://api.github.com/'
 
-    def __init__(self, token=None, session=None):
-        super().__init__(token, session)
+    SERVICE = 'github'
+
+    ENDPOINTS = (
+        (re.compile(r'/repos/[^/]+/[^/]+/labels/[^/]+$'), 'repos/{owner}/{repo}/labels/{name}'),
+        (re.compile(r'/repos/[^/]+/[^/]+/labels$'), 'repos/{owner}/{repo}/labels'),
+        (re.compile(r'/user/repos$'), 'user/repos'),
+        (re.compile(r'/graphql$'), 'graphql'),
+    )
+
+    # Number of repositories whose labels are requested by one GraphQL query
+    GRAPHQL_BATCH = 25
+
+    # GraphQL queries sent at the same time, concurrent ones hit secondary rate limits
+    GRAPHQL_CONCURRENCY = 2
+
+    LABELS_QUERY = '''
+        {alias}: repository(owner: ${alias}_owner, name: ${alias}_name) {{
+            labels(first: 100, after: ${alias}_cursor) {{
+                nodes {{ name color description }}
+                pageInfo {{ hasNextPage endCursor }}
+            }}
+        }}'''
+
+    def __init__(self, token=None, session=None, limiter=None, cache=None, retry=None):
+        super().__init__(token, session, limiter, cache, retry)
+        # GraphQL API has its own rate limit budget
+        self.graphql_limiter = RateLimiter(self.limiter.reserve, self.limiter.max_backoff)
+
+    async def _get_labels_batch(self, reposlugs):
+        """ Retrieves labels of up to `GRAPHQL_BATCH` repositories with GraphQL queries. \
+            Every query asks for next page of labels of all repositories which have more. """
+        URL = f'{self.API_ENDPOINT}graphql'
+        results = {reposlug: [] for reposlug in reposlugs}
+        cursors = {reposlug: None for reposlug in reposlugs}
+
+        while cursors:
+            pending = list(cursors)
+            parts = []
+            declarations = []
+            variables = {}
+            for i, reposlug in enumerate(pending):
+                alias = f'r{i}'
+                owner, name = reposlug.split('/')
+                parts.append(self.LABELS_QUERY.format(alias=alias))
+                declarations.append(f'${alias}_owner: String!, ${alias}_name: String!, ${alias}_cursor: String')
+                variables.update({
+                    f'{alias}_owner': owner,
+                    f'{alias}_name': name,
+                    f'{alias}_cursor': cursors[reposlug]
+                })
+            query = f'query({", ".join(declarations)}) {{{"".join(parts)}\n}}'
+
+            resp = await self._request('POST', URL, json={'query': query, 'variables': variables}, limiter=self.graphql_limiter, idempotent=True)
+            data = resp.data.get('data')
+            failures = [error for error in resp.data.get('errors') or [] if not error.get('path')]
+            if data is None or failures:
+                # Whole query failed, e.g. by rate limit, it says nothing about the repositories
+                failure = (failures or resp.data.get('errors') or [{}])[0]
+                error_class = RateLimitError if failure.get('type') == 'RATE_LIMITED' else APIError
+                raise error_class(failure.get('message') or 'GraphQL query failed', resp.status, 'POST', URL)
+            errors = {
+                error['path'][0]: error.get('message')
+                for error in resp.data.get('errors') or [] if error.get('path')
+            }
+
+            cursors = {}
+            for i, reposlug in enumerate(pending):
+                alias = f'r{i}'
+                repository = data.get(alias)
+                if repository is None:
+                    results[reposlug] = NotFoundError(errors.get(alias, f'Repository {reposlug} not found'))
+                    continue
+                page = repository['labels']
+                results[reposlug].extend(
+                    Label(label['name'], label['color'], label['description']) for label in page['nodes']
+                )
+                if page['pageInfo']['hasNextPage']:
+                    cursors[reposlug] = page['pageInfo']['endCursor']
+        return results
+
+    async def get_labels_bulk(self, reposlugs):
+        """ Retrieves labels of many repositories with GitHub GraphQL API. \
+            Returns labels or exception for every repository. """
+        reposlugs = list(reposlugs)
+        batches = [reposlugs[i:i + self.GRAPHQL_BATCH] for i in range(0, len(reposlugs), self.GRAPHQL_BATCH)]
+        semaphore = asyncio.Semaphore(self.GRAPHQL_CONCURRENCY)
+
+        async def _get_batch(batch):
+            async with semaphore:
+                return await self._get_labels_batch(batch)
+
+        results = {}
+        for batch in await asyncio.gather(*[_get_batch(batch) for batch in batches]):
+            results.update(batch)
+        return results
         
     async def get_repos(self):
-        URL = f'https://api.github.com/user/repos'
+        URL = f'{self.API_ENDPOINT}user/repos'
         payload = {'per_page':100}
 
-        # Get first page of repositories synchronously
-        headers = {
-            'User-Agent': 'Labelatory',
-            'Authorization': f'token {self.token}'
-        }
-        resp = requests.get(URL, headers=headers, params=payload)
-        if resp.status_code != 200:
-            raise Exception(resp.text)
-        page = resp.json()
-        if not resp.links.get('next'):
-            return [repo['full_name'] for repo in page]
-        
-        # If there are more pages, get them in ansynchronous manner
-        while resp.links.get('next'):
-            URL = resp.links['next']['url']
-            async with self.session.get(URL) as resp:
-                if resp.status != 200:
-                    raise Exception(resp.reason)
-                page_content = await resp.json()
-                page.extend(page_content)
+        page, _ = await self._get_pages(URL, payload)
         return [repo['full_name'] for repo in page]
 
     async def get_labels(self, reposlug):
         user, repo = reposlug.split('/')
-        URL = f'https://api.github.com/repos/{user}/{repo}/labels'
+        URL = f'{self.API_ENDPOINT}repos/{user}/{repo}/labels'
         payload = {'per_page':100}
 
-        # Get first page of labels synchronously
-        headers = {
-            'User-Agent': 'Labelatory',
-            'Authorization': f'token {self.token}'
-        }
-        resp = requests.get(URL, headers=headers, params=payload)
-        if resp.status_code != 200:
-            raise Exception(resp.text)
-        page = resp.json()
-        if not resp.links.get('next'):
-            return [Label(label['name'], label['color'], label['description']) for label in page]
-        
-        # If there are more pages, get them in ansynchronous manner
-        while resp.links.get('next'):
-            URL = resp.links['next']['url']
-            async with self.session.get(URL) as resp:
-                if resp.status != 200:
-                    raise Exception(resp.reason)
-                page_content = await resp.json()
-                page.extend(page_content)
-
-        return [Label(label['name'], label['color'], label['description']) for label in page]# (resp.status, page)
+        return await self._get_labels(URL, payload)
 
     async def get_label(self, reposlug, label_name):
         user, repo = reposlug.split('/')
-        URL = f'https://api.github.com/repos/{user}/{repo}/labels/{label_name}'
+        URL = f'{self.API_ENDPOINT}repos/{user}/{repo}/labels/{label_name}'
 
-        async with self.session.get(URL) as resp:
-            if resp.status != 200:
-                raise Exception(resp.reason)
-            resp_label = await resp.json()
+        resp = await self._request('GET', URL)
+        resp_label = resp.data
         return Label(
             resp_label['name'], 
             resp_label['color'], 
@@ -124,7 +372,7 @@ class GitHubConnector(DefaultConnector):
 
     async def create_label(self, reposlug, label):
         user, repo = reposlug.split('/')
-        URL = f'https://api.github.com/repos/{user}/{repo}/labels'
+        URL = f'{self.API_ENDPOINT}repos/{user}/{repo}/labels'
         color = label.color
         if label.color.startswith('#'):
             color = color[1:]
@@ -134,10 +382,8 @@ class GitHubConnector(DefaultConnector):
             'description':label.description
         }
 
-        async with self.session.post(URL, json=data) as resp:
-            if resp.status != 201:
-                raise Exception(resp.reason)
-            resp_result = await resp.json()
+        resp = await self._request('POST', URL, expected=(201,), json=data)
+        resp_result = resp.data
 
         return Label(
             resp_result['name'], 
@@ -147,15 +393,13 @@ class GitHubConnector(DefaultConnector):
 
     async def remove_label(self, reposlug, label):
         user, repo = reposlug.split('/')
-        URL = f'https://api.github.com/repos/{user}/{repo}/labels/{label.name}'
+        URL = f'{self.API_ENDPOINT}repos/{user}/{repo}/labels/{label.name}'
 
-        async with self.session.delete(URL) as resp:
-            if resp.status != 204:
-                raise Exception(resp.reason)
+        await self._request('DELETE', URL, expected=(204,))
 
     async def update_label(self, reposlug, label):
         user, repo = reposlug.split('/')
-        URL = f'https://api.github.com/repos/{user}/{repo}/labels/{label._old_name}'
+        URL = f'{self.API_ENDPOINT}repos/{user}/{repo}/labels/{label._old_name}'
         color = label.color
         if label.color.startswith('#'):
             color = color[1:]
@@ -165,86 +409,51 @@ class GitHubConnector(DefaultConnector):
             'description': label.description
         }
 
-        async with self.session.patch(URL, json=data) as resp:
-            if resp.status != 200:
-                resp_result = await resp.json()
-                raise Exception(resp.reason)
-            resp_result = await resp.json()
-            label._old_name = label.name
-        return label
+        await self._request('PATCH', URL, json=data)
+        return label.replace(old_name=label.name)
         
 
     
 class GitLabConnector(DefaultConnector):
-    def __init__(self, host=None, token=None, session=None):
-        super().__init__(token, session)
+
+    SERVICE = 'gitlab'
+
+    ENDPOINTS = (
+        (re.compile(r'/projects/[^/]+/labels/[^/]+$'), 'projects/{id}/labels/{name}'),
+        (re.compile(r'/projects/[^/]+/labels$'), 'projects/{id}/labels'),
+        (re.compile(r'/groups/[^/]+/labels/[^/]+$'), 'groups/{id}/labels/{name}'),
+        (re.compile(r'/groups/[^/]+/labels$'), 'groups/{id}/labels'),
+        (re.compile(r'/projects$'), 'projects'),
+    )
+
+    def __init__(self, host=None, token=None, session=None, limiter=None, cache=None, retry=None):
+        super().__init__(token, session, limiter, cache, retry)
         if host:
             self.host = host
         else:
             self.host = 'gitlab.com'
+        self.api_url = f'https://{self.host}/api/v4'
 
     async def get_repos(self):
-        URL = f'https://{self.host}/api/v4/projects'
-        payload = {'per_page':100, 'membership':True}
+        URL = f'{self.api_url}/projects'
+        payload = {'per_page':100, 'membership':'true'}
+
+        page, _ = await self._get_pages(URL, payload)
+        return [repo['path_with_namespace'] for repo in page]
 
-        # Get first page of repositories synchronously
-        headers = {
-            'User-Agent': 'Labelatory',
-            'PRIVATE-TOKEN': f'{self.token}'
-        }
-        resp = requests.get(URL, headers=headers, params=payload)
-        if resp.status_code != 200:
-            raise Exception(resp.text)
-        page = resp.json()
-        if not resp.links.get('next'):
-            return [repo['path_with_namespace'] for repo in page]
-        
-        # If there are more pages, get them in ansynchronous manner
-        while resp.links.get('next'):
-            URL = resp.links['next']['url']
-            async with self.session.get(URL) as resp:
-                if resp.status != 200:
-                    raise Exception(resp.reason)
-                page_content = await resp.json()
-                page.extend(page_content)
-        return [repo['full_name'] for repo in page]    
-    
     async def get_labels(self, reposlug):
         reposlug = reposlug.replace('/', '%2F')
-        URL = f'https://{self.host}/api/v4/projects/{reposlug}/labels'
+        URL = f'{self.api_url}/projects/{reposlug}/labels'
         payload = {'per_page':100}
 
-        # Get first page of labels synchronously
-        headers = {
-            'User-Agent': 'Labelatory',
-            'PRIVATE-TOKEN': f'{self.token}'
-        }
-        resp = requests.get(URL, headers=headers, params=payload)
-        if resp.status_code != 200:
-            raise Exception(resp.text)
-        page = resp.json()
-        if not resp.links.get('next'):
-            return [Label(label['name'], label['color'], label['description']) for label in page]
-        
-        # If there are more pages, get them in ansynchronous manner
-        while resp.links.get('next'):
-            URL = resp.links['next']['url']
-            async with self.session.get(URL) as resp:
-                if resp.status != 200:
-                    raise Exception(resp.reason)
-                page_content = await resp.json()
-                page.extend(page_content)
-
-        return [Label(label['name'], label['color'], label['description']) for label in page]
+        return await self._get_labels(URL, payload)
 
     async def get_label(self, reposlug, label_name):
         reposlug = reposlug.replace('/', '%2F')
-        URL = f'https://{self.host}/api/v4/projects/{reposlug}/labels/{label_name}'
+        URL = f'{self.api_url}/projects/{reposlug}/labels/{label_name}'
 
-        async with self.session.get(URL) as resp:
-            if resp.status != 200:
-                raise Exception(resp.reason)
-            resp_label = await resp.json()
+        resp = await self._request('GET', URL)
+        resp_label = resp.data
         return Label(
             resp_label['name'], 
             resp_label['color'], 
@@ -253,7 +462,7 @@ class GitLabConnector(DefaultConnector):
 
     async def create_label(self, reposlug, label):
         reposlug = reposlug.replace('/', '%2F')
-        URL = f'https://{self.host}/api/v4/projects/{reposlug}/labels'
+        URL = f'{self.api_url}/projects/{reposlug}/labels'
 
         data = {
             'name': label.name, 
@@ -261,10 +470,8 @@ class GitLabConnector(DefaultConnector):
             'description':label.description
         }
 
-        async with self.session.post(URL, json=data) as resp:
-            if resp.status != 201:
-                raise Exception(resp.reason)
-            resp_result = await resp.json()
+        resp = await self._request('POST', URL, expected=(201,), json=data)
+        resp_result = resp.data
 
         return Label(
             resp_result['name'], 
@@ -274,15 +481,13 @@ class GitLabConnector(DefaultConnector):
 
     async def remove_label(self, reposlug, label):
         reposlug = reposlug.replace('/', '%2F')
-        URL = f'https://{self.host}/api/v4/projects/{reposlug}/labels/{label.name}'
+        URL = f'{self.api_url}/projects/{reposlug}/labels/{label.name}'
 
-        async with self.session.delete(URL) as resp:
-            if resp.status != 204:
-                raise Exception(resp.reason)
+        await self._request('DELETE', URL, expected=(204,))
 
     async def update_label(self, reposlug, label):
         reposlug = reposlug.replace('/', '%2F')
-        URL = f'https://{self.host}/api/v4/projects/{reposlug}/labels/{label._old_name}'
+        URL = f'{self.api_url}/projects/{reposlug}/labels/{label._old_name}'
 
         data = {
             'new_name': label.name,
@@ -290,13 +495,65 @@ class GitLabConnector(DefaultConnector):
             'description': label.description
         }
 
-        async with self.session.patch(URL, json=data) as resp:
-            if resp.status != 200:
-                raise Exception(resp.reason)
-            resp_result = await resp.json()
-            label._old_name = label.name
-        return label
+        # Repeated rename would not find the label under its old name
+        await self._request('PUT', URL, json=data, idempotent=label._old_name == label.name)
+        return label.replace(old_name=label.name)
 
-    
+    def _parse_label(self, label):
+        # Project labels list includes labels of ancestor groups
+        return Label(
+            label['name'],
+            label['color'],
+            label['description'],
+            inherited=not label.get('is_project_label', True)
+        )
+
+    async def get_group_labels(self, group):
+        """ Retrieves labels defined by the group itself. """
+        group = group.replace('/', '%2F')
+        URL = f'{self.api_url}/groups/{group}/labels'
+        payload = {'per_page':100, 'only_group_labels':'true', 'include_ancestor_groups':'false'}
+
+        return await self._get_labels(URL, payload)
+
+    async def create_group_label(self, group, label):
+        """ Creates new label in given group. """
+        group = group.replace('/', '%2F')
+        URL = f'{self.api_url}/groups/{group}/labels'
+
+        data = {
+            'name': label.name,
+            'color': label.color,
+            'description': label.description
+        }
+
+        resp = await self._request('POST', URL, expected=(201,), json=data)
+        resp_result = resp.data
+
+        return Label(
+            resp_result['name'],
+            resp_result['color'],
+            resp_result['description'],
+            inherited=True
+        )
+
+    async def remove_group_label(self, group, label):
+        """ Removes label of the group. """
+        group = group.replace('/', '%2F')
+        URL = f'{self.api_url}/groups/{group}/labels/{label.name}'
+
+        await self._request('DELETE', URL, expected=(204,))
+
+    async def update_group_label(self, group, label):
+        """ Updates existing label of the group. """
+        group = group.replace('/', '%2F')
+        URL = f'{self.api_url}/groups/{group}/labels/{label._old_name}'
+
+        data = {
+            'new_name': label.name,
+            'color': label.color,
+            'description': label.description
+        }
 
-    
\ No newline at end of file
+        await self._request('PUT', URL, json=data, idempotent=label._old_name == label.name)
+        return label.replace(old_name=label.name)
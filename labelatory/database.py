@@ -0,0 +1,40 @@
+import sqlite3
+import threading
+
+
+class Database():
+    """ Local SQLite database shared by threads of the application. \
+        Subclasses define SCHEMA, which is created when the database is opened. """
+
+    SCHEMA = ''
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(self.SCHEMA)
+
+    def _columns(self, table):
+        return [row[1] for row in self._db.execute(f'PRAGMA table_info({table})')]
+
+    def _execute(self, *statements):
+        """ Executes statements in one transaction. """
+        with self._lock:
+            self._db.execute('BEGIN')
+            try:
+                for sql, params in statements:
+                    self._db.execute(sql, params)
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
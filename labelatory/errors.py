@@ -0,0 +1,49 @@
+class APIError(Exception):
+    """ Request to the API of a git service failed. \
+        Message is the reason, so results and reports read as before. """
+
+    # Whether repeating the request may succeed
+    retryable = False
+
+    def __init__(self, reason, status=None, method=None, url=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.status = status
+        self.method = method
+        self.url = url
+
+
+class NotFoundError(APIError):
+    """ Repository, group or label does not exist. """
+
+
+class AuthError(APIError):
+    """ Token is missing, invalid or lacks permissions. """
+
+
+class RateLimitError(APIError):
+    """ Request was still rejected by rate limit after the rate limiter backed off. """
+
+
+class TransientError(APIError):
+    """ Server error, timeout or lost connection, repeating the request may succeed. """
+    retryable = True
+
+
+class CircuitOpenError(APIError):
+    """ Host failed repeatedly, requests to it are not sent for a while. """
+
+
+def from_status(status, reason, method=None, url=None):
+    """ Returns typed error of a failed response. """
+    if status == 404:
+        cls = NotFoundError
+    elif status in (401, 403):
+        cls = AuthError
+    elif status == 429:
+        cls = RateLimitError
+    elif status >= 500 or status == 408:
+        cls = TransientError
+    else:
+        cls = APIError
+    return cls(reason or f'HTTP {status}', status, method, url)
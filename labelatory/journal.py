@@ -0,0 +1,219 @@
+import os
+import json
+import time
+import uuid
+import threading
+
+from .database import Database
+
+
+class RunInProgressError(Exception):
+    """ Fix run is already in progress, in this or another process. """
+
+
+class FixJournal(Database):
+    """ Local SQLite journal of bulk fix runs. \
+        Every run records status of its repositories and the operations already applied,
+        so a run interrupted by a crash or restart can be resumed with the remaining repositories.
+        Runs which completed, even with failures, and runs older than `max_age` seconds
+        are resumed only when asked for by their id.
+        Every run records process which owns it, only one run can be in progress at a time. """
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS runs (
+            run_id TEXT PRIMARY KEY,
+            started_at REAL NOT NULL,
+            finished_at REAL,
+            status TEXT NOT NULL DEFAULT 'running',
+            owner INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS run_repos (
+            run_id TEXT NOT NULL,
+            service TEXT NOT NULL,
+            reposlug TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            error TEXT,
+            updated_at REAL,
+            PRIMARY KEY (run_id, service, reposlug)
+        );
+        CREATE TABLE IF NOT EXISTS run_operations (
+            run_id TEXT NOT NULL,
+            service TEXT NOT NULL,
+            target TEXT NOT NULL,
+            operation TEXT NOT NULL,
+            applied_at REAL NOT NULL
+        );
+    '''
+
+    def __init__(self, path, max_age=86400):
+        super().__init__(path)
+        self.max_age = max_age
+        # Runs owned by this journal, they are released when finished
+        self._active = set()
+        self._runs_lock = threading.Lock()
+
+        # Journals created before runs had status lack the column
+        if 'status' not in self._columns('runs'):
+            self._db.execute('ALTER TABLE runs ADD COLUMN status TEXT NOT NULL DEFAULT \'running\'')
+            self._db.execute('UPDATE runs SET status = \'done\' WHERE finished_at IS NOT NULL')
+        if 'owner' not in self._columns('runs'):
+            self._db.execute('ALTER TABLE runs ADD COLUMN owner INTEGER')
+
+    def _is_live(self, run_id, owner):
+        """ Tells if owner of the run is still fixing it. """
+        if owner is None:
+            return False
+        if owner == os.getpid():
+            return run_id in self._active
+        try:
+            os.kill(owner, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def _claim(self, run_id):
+        """ Makes this process owner of the run, unless another run is in progress. """
+        rows = self._query('SELECT run_id, owner FROM runs WHERE status = \'running\'')
+        for other_id, owner in rows:
+            if self._is_live(other_id, owner):
+                raise RunInProgressError(f'Fix run {other_id} is in progress!')
+        self._active.add(run_id)
+
+    def start(self, services):
+        """ Starts new run of all enabled repositories of the services and returns its id. """
+        run_id = uuid.uuid4().hex[:12]
+        statements = [(
+            'INSERT INTO runs (run_id, started_at, owner) VALUES (?, ?, ?)', (run_id, time.time(), os.getpid())
+        )]
+        statements.extend(
+            ('INSERT INTO run_repos (run_id, service, reposlug) VALUES (?, ?, ?)', (run_id, service.name, reposlug))
+            for service in services
+            for reposlug, enabled in service.repos.items() if enabled
+        )
+        with self._runs_lock:
+            self._claim(run_id)
+            try:
+                self._execute(*statements)
+            except Exception:
+                self._active.discard(run_id)
+                raise
+        return run_id
+
+    def exists(self, run_id):
+        return bool(self._query('SELECT 1 FROM runs WHERE run_id = ?', (run_id,)))
+
+    def interrupted(self):
+        """ Returns id of the latest recent run which was interrupted, if there is one. \
+            Runs still in progress are skipped. """
+        rows = self._query(
+            'SELECT run_id, owner FROM runs WHERE status = \'running\' AND started_at > ? ORDER BY started_at DESC',
+            (time.time() - self.max_age,)
+        )
+        for run_id, owner in rows:
+            if not self._is_live(run_id, owner):
+                return run_id
+        return None
+
+    def resume(self, run_id):
+        """ Marks run as running again, owned by this process. """
+        with self._runs_lock:
+            self._claim(run_id)
+            try:
+                self._execute((
+                    'UPDATE runs SET finished_at = NULL, status = \'running\', owner = ? WHERE run_id = ?',
+                    (os.getpid(), run_id)
+                ))
+            except Exception:
+                self._active.discard(run_id)
+                raise
+
+    def release(self, run_id):
+        """ Gives up the run without completing it, so it can be resumed. """
+        with self._runs_lock:
+            self._active.discard(run_id)
+
+    def done(self, run_id, service):
+        """ Returns repositories of the service already fixed by the run. """
+        rows = self._query(
+            'SELECT reposlug FROM run_repos WHERE run_id = ? AND service = ? AND status = \'done\'',
+            (run_id, service)
+        )
+        return {reposlug for reposlug, in rows}
+
+    def operation_done(self, run_id, service, target, operation):
+        """ Records operation applied on repository or group. """
+        self._execute((
+            'INSERT INTO run_operations VALUES (?, ?, ?, ?, ?)',
+            (run_id, service, target, json.dumps(operation.to_dict()), time.time())
+        ))
+
+    def repo_done(self, run_id, service, reposlug, result):
+        """ Records result of fixing repository, exception marks it as failed. """
+        if isinstance(result, Exception):
+            status, error = 'failed', str(result)
+        else:
+            status, error = 'done', None
+        self._execute((
+            'INSERT INTO run_repos (run_id, service, reposlug, status, error, updated_at) VALUES (?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT (run_id, service, reposlug) DO UPDATE SET '
+            'status = excluded.status, error = excluded.error, updated_at = excluded.updated_at',
+            (run_id, service, reposlug, status, error, time.time())
+        ))
+
+    def finish(self, run_id, failed=False):
+        """ Marks run as completed, failed one still can be resumed by its id. """
+        self._execute((
+            'UPDATE runs SET finished_at = ?, status = ? WHERE run_id = ?',
+            (time.time(), 'failed' if failed else 'done', run_id)
+        ))
+        self.release(run_id)
+
+    def runs(self, limit=20):
+        """ Returns summaries of the latest runs. """
+        rows = self._query(
+            'SELECT run_id, started_at, finished_at, status FROM runs ORDER BY started_at DESC LIMIT ?', (limit,)
+        )
+        summaries = []
+        for run_id, started_at, finished_at, status in rows:
+            counts = dict(self._query(
+                'SELECT status, COUNT(*) FROM run_repos WHERE run_id = ? GROUP BY status', (run_id,)
+            ))
+            operations = self._query('SELECT COUNT(*) FROM run_operations WHERE run_id = ?', (run_id,))[0][0]
+            summaries.append({
+                'run_id': run_id,
+                'started_at': started_at,
+                'finished_at': finished_at,
+                'status': status,
+                'pending': counts.get('pending', 0),
+                'done': counts.get('done', 0),
+                'failed': counts.get('failed', 0),
+                'operations': operations
+            })
+        return summaries
+
+    @classmethod
+    def load(cls, cfg):
+        """ Loads journal from 'journal' section of configuration, if there is one. """
+        path = cfg.get('journal', 'path', fallback=None)
+        if not path:
+            return None
+        return FixJournal(path, max_age=cfg.getint('journal', 'max_age', fallback=86400))
+
+
+class FixRun():
+    """ Run of the journal which services report their progress to. """
+
+    def __init__(self, journal, run_id):
+        self.journal = journal
+        self.run_id = run_id
+
+    def done(self, service):
+        return self.journal.done(self.run_id, service.name)
+
+    def operation_done(self, service, target, operation):
+        self.journal.operation_done(self.run_id, service.name, target, operation)
+
+    def repo_done(self, service, reposlug, result):
+        self.journal.repo_done(self.run_id, service.name, reposlug, result)
@@ -1,10 +1,69 @@
+import sys
+
+
+def _intern(value):
+    """ Interns string, so labels repeated across repositories share one object. """
+    return sys.intern(value) if type(value) is str else value
+
 
 class Label():
-    def __init__(self, name, color, description):
-        self.name = name
-        self._old_name = name
-        self.color = color
-        self.description = description
+    """ Immutable label. Names, colors and descriptions are interned, \
+        because the same labels repeat in every repository of a scan.
+        Changed label is made by replace(). """
+
+    __slots__ = ('name', 'color', 'description', 'inherited', '_old_name', '_hash')
+
+    def __init__(self, name, color, description, inherited=False, old_name=None):
+        setattr_ = object.__setattr__
+        setattr_(self, 'name', _intern(name))
+        # Name of the label in repository, differs from name while renaming
+        setattr_(self, '_old_name', _intern(old_name) if old_name else self.name)
+        setattr_(self, 'color', _intern(color))
+        setattr_(self, 'description', _intern(description))
+        # Label is defined by a parent group, not by the repository itself
+        setattr_(self, 'inherited', inherited)
+        setattr_(self, '_hash', hash((self.name, self.color, self.description, inherited)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'Label is immutable, use replace() to change {name}')
+
+    def __delattr__(self, name):
+        raise AttributeError('Label is immutable')
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, Label):
+            return NotImplemented
+        # Interned strings are mostly compared by identity
+        return (
+            self._hash == other._hash
+            and self.name == other.name
+            and self.color == other.color
+            and self.description == other.description
+            and self.inherited == other.inherited
+        )
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return (Label, (self.name, self.color, self.description, self.inherited, self._old_name))
+
+    def __repr__(self):
+        return f'Label({self.name!r}, {self.color!r}, {self.description!r})'
+
+    def replace(self, **changes):
+        """ Returns copy of the label with given fields changed. """
+        fields = {
+            'name': self.name,
+            'color': self.color,
+            'description': self.description,
+            'inherited': self.inherited,
+            'old_name': self._old_name
+        }
+        fields.update(changes)
+        return Label(**fields)
 
     @classmethod
     def load(cls, cfg_labels):
@@ -12,8 +71,32 @@ class Label():
 
 class Violation():
     """ Holds the violation. Can be color, description or name """
+
+    __slots__ = ('type', 'label', 'found', 'required')
+
     def __init__(self, type, label, found=None, required=None):
-        self.label = label
-        self.type = type
-        self.required = required
-        self.found = found
\ No newline at end of file
+        setattr_ = object.__setattr__
+        setattr_(self, 'label', label)
+        setattr_(self, 'type', _intern(type))
+        setattr_(self, 'required', _intern(required))
+        setattr_(self, 'found', _intern(found))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Violation is immutable')
+
+    def __eq__(self, other):
+        if not isinstance(other, Violation):
+            return NotImplemented
+        return (
+            self.type == other.type and self.label == other.label
+            and self.found == other.found and self.required == other.required
+        )
+
+    def __hash__(self):
+        return hash((self.type, self.label, self.found, self.required))
+
+    def __reduce__(self):
+        return (Violation, (self.type, self.label, self.found, self.required))
+
+    def __repr__(self):
+        return f'Violation({self.type!r}, {self.label!r})'
@@ -1,4 +1,6 @@
 import os
+import atexit
+import logging
 import pathlib
 import configparser
 import distutils.util
@@ -7,10 +9,22 @@ import asyncio
 import requests
 import base64
 import json
+import queue
 
 
 
 from .label import Label, Violation
+from .pool import ConnectionPool
+from .loop import BackgroundLoop
+from .store import LabelStore
+from .rules import RuleIndex
+from .plan import load_operations
+from .webhooks import WebhookQueue
+from .scheduler import DriftScanner
+from .shard import ShardPool
+from .journal import FixJournal, FixRun, RunInProgressError
+from . import metrics
+from . import tracing
 from .services import *
 
 from flask import Flask, url_for, render_template, request, abort, redirect, jsonify
@@ -18,15 +32,29 @@ from flask import Flask, url_for, render_template, request, abort, redirect, jso
 
 LOCAL_LABELS_CONF_SOURCE = 'labels_conf.cfg'
 
+logger = logging.getLogger(__name__)
+
 
 class LabelatoryConfig():
     """ Stores common configuration for the application. \
         services - supported services;\
-        labels_rules - rules for labels; """
-    def __init__(self, services=None, labels_rules=None, source_secret=None):
+        labels_rules - rules for labels;\
+        pool - HTTP connection pool shared by services;\
+        store - local store of last known labels;\
+        webhooks - queue of webhook events;\
+        scanner - scheduled scanner of label drift;\
+        shards - processes checking very large services;\
+        journal - checkpoints of bulk fix runs; """
+    def __init__(self, services=None, labels_rules=None, source_secret=None, pool=None, store=None, webhooks=None, scanner=None, shards=None, journal=None):
         self.services = services
         self.labels_rules = labels_rules
         self.source_secrete = source_secret
+        self.pool = pool
+        self.store = store
+        self.webhooks = webhooks
+        self.scanner = scanner
+        self.shards = shards
+        self.journal = journal
 
 
 
@@ -120,10 +148,23 @@ class ConfigLoader():
 
         label_sections = (s for s in cfg_labels.sections() if s.startswith('label:'))
         services=[cls._load_service(cfg, cfg_labels, service) for service in service_sections]
+
+        # All services share one pool of connections and one store of labels
+        pool = ConnectionPool.load(cfg)
+        store = LabelStore.load(cfg)
+        for service in services:
+            service.pool = pool
+            service.store = store
+
         return services, LabelatoryConfig(
             # Loads every supported service
             labels_rules={label_rule[6:]: cls._load_label_rule(cfg_labels, label_rule) for label_rule in label_sections},
-            source_secret=remote_secret
+            source_secret=remote_secret,
+            pool=pool,
+            store=store,
+            webhooks=WebhookQueue.load(cfg),
+            scanner=DriftScanner.load(cfg),
+            journal=FixJournal.load(cfg)
         )
 
 
@@ -141,72 +182,328 @@ def load_app(path):
         cfg = configparser.ConfigParser()
         with open(path) as f:
             cfg.read_file(f)
-        return ConfigLoader.load(cfg)
+        tracing.configure(cfg)
+        services, config = ConfigLoader.load(cfg)
+        # Worker processes load the services from the same file
+        config.shards = ShardPool.load(cfg, os.path.abspath(path))
+        return services, config
     except Exception as e:
         print(e)
         exit(1)
 
 
-def fix_labels_async_wrapper(cfg):
-    """ Fixes labels of all enabled repositories for all supported services.  """
+def rule_index(cfg):
+    """ Returns labels rules compiled into index. \
+        The index is compiled once and kept until the rules change. """
+    index = cfg.get('rules')
+    if index is None:
+        index = RuleIndex(cfg['cfg'])
+        cfg['rules'] = index
+    return index
+
+
+def check_service(cfg, service, labels_rules, incremental=False, on_progress=None, skip=()):
+    """ Checks all repositories of the service, in worker processes if it is large enough. """
+    shards = cfg.get('shards')
+    if shards and shards.handles(service):
+        return shards.check_all(service, labels_rules, incremental, on_progress, skip)
+    return service.check_all(labels_rules, incremental, on_progress, skip)
+
+def fix_run(cfg, resume=True):
+    """ Returns run of the fix journal to checkpoint the fix to, if the journal is configured. \
+        resume - True continues the latest recent run which was interrupted before it completed,
+        False always starts a new one, id of a run continues that run.
+        RunInProgressError is raised when another fix run is in progress. """
+    journal = cfg.get('journal')
+    if not journal:
+        return None
+    run_id = resume if isinstance(resume, str) else (journal.interrupted() if resume else None)
+    if run_id:
+        if not journal.exists(run_id):
+            raise Exception(f'Fix run {run_id} does not exist!')
+        logger.info(f'Resuming fix run {run_id}')
+        journal.resume(run_id)
+    else:
+        run_id = journal.start(cfg['services'])
+    return FixRun(journal, run_id)
+
+async def _fix_labels(cfg, run, on_progress=None):
+    """ Checks and fixes all enabled repositories, checkpointing progress to the run. """
+    services = cfg['services']
+    labels_rules = rule_index(cfg)
+
+    def _on_progress(service, reposlug, result):
+        if isinstance(result, Exception):
+            logger.warning(f'Fixing {service.name} repository {reposlug} failed: {result}')
+        else:
+            logger.info(f'Fixed {service.name} repository {reposlug}')
+        if on_progress:
+            on_progress(service, reposlug, result)
+
+    tasks = []
+    for service in services:
+        skip = run.done(service) if run else ()
+        task = asyncio.ensure_future(check_service(cfg, service, labels_rules, skip=skip))
+        tasks.append(task)
+    results = await asyncio.gather(return_exceptions=True, *tasks)
+
+    tasks = []
+    for result in results:
+        if isinstance(result, Exception):
+            continue
+        service, checked_repos = result
+        if checked_repos:
+            task = asyncio.ensure_future(service.fix_all(labels_rules, checked_repos, _on_progress, run))
+            tasks.append(task)
+
+    fix_results = await asyncio.gather(return_exceptions=True, *tasks)
+    if run:
+        # Run with failed services completed too, it is resumed only by its id
+        run.journal.finish(run.run_id, any(isinstance(result, Exception) for result in results + fix_results))
+    return fix_results
+
+def fix_labels_async_wrapper(cfg, on_progress=None, resume=True):
+    """ Fixes labels of all enabled repositories for all supported services. \
+        on_progress(service, reposlug, result) is called for every fixed repository.
+        With journal configured, repositories fixed by the resumed run are not checked again. """
+    run = fix_run(cfg, resume)
+    try:
+        return cfg['loop'].run(tracing.in_span('fix_labels', _fix_labels(cfg, run, on_progress)))
+    finally:
+        if run:
+            # Unfinished run can be resumed by the next fix
+            run.journal.release(run.run_id)
+
+def fix_labels_stream(cfg, resume=True, keepalive=15):
+    """ Starts fixing labels and returns generator of result of every repository as soon as it is fixed. \
+        Yields (event, data) pairs: 'start' with id of the run, 'repo' with result and progress counters,
+        'failed' for failed service and 'done' with totals.
+        (None, None) is yielded when nothing happened for `keepalive` seconds.
+        The run is claimed before returning, so RunInProgressError is raised right away. """
+    run = fix_run(cfg, resume)
+    events = queue.Queue()
+    counters = {'fixed': 0, 'errors': 0}
+
+    def _on_progress(service, reposlug, result):
+        events.put((service, reposlug, result))
+
+    def _done(_):
+        if run:
+            # Unfinished run can be resumed by the next fix
+            run.journal.release(run.run_id)
+        events.put(None)
+
+    try:
+        future = cfg['loop'].submit(tracing.in_span('fix_labels', _fix_labels(cfg, run, _on_progress)))
+    except BaseException:
+        _done(None)
+        raise
+    # Results are passed from the background loop to the web handler thread
+    future.add_done_callback(_done)
+
+    def _events():
+        yield 'start', {'run_id': run.run_id if run else None}
+        try:
+            while True:
+                try:
+                    item = events.get(timeout=keepalive)
+                except queue.Empty:
+                    yield None, None
+                    continue
+                if item is None:
+                    break
+
+                service, reposlug, result = item
+                data = {'service': service.name, 'repository': reposlug}
+                if isinstance(result, Exception):
+                    counters['errors'] += 1
+                    data.update(status='error', error=str(result))
+                else:
+                    counters['fixed'] += 1
+                    data.update(status='fixed' if all(result) else 'partial')
+                data.update(counters)
+                yield 'repo', data
+
+            for result in future.result():
+                if isinstance(result, Exception):
+                    yield 'failed', {'error': str(result)}
+            yield 'done', dict(counters)
+        finally:
+            # Client went away, the run is left to be resumed later
+            future.cancel()
+
+    return _events()
+
+def check_labels_async_wrapper(cfg, incremental=False):
+    """ Checks labels if they conform the rules. \
+        In incremental mode only dirty or stale repositories are fetched. """
     services = cfg['services']
-    labels_rules = cfg['cfg']
-    from pprint import pprint
+    labels_rules = rule_index(cfg)
     async def _solve_tasks():
         tasks = []
         for service in services:
-            task = asyncio.ensure_future(service.check_all(labels_rules))
+            task = asyncio.ensure_future(check_service(cfg, service, labels_rules, incremental))
             tasks.append(task)
-        results = await asyncio.gather(return_exceptions=True, *tasks)
-        pprint(results)
-
-        tasks = []
-        for result in results:
-            service, checked_repos = result
-            if checked_repos:
-                task = asyncio.ensure_future(service.fix_all(labels_rules, checked_repos))
-                tasks.append(task)
-        print(tasks)
 
         results = await asyncio.gather(return_exceptions=True, *tasks)
-        # pprint(results)
         return results
 
-    asyncio.set_event_loop(asyncio.SelectorEventLoop())
-    loop = asyncio.get_event_loop()
-    results = loop.run_until_complete(_solve_tasks())
-    loop.close()
-    return results
 
-def check_labels_async_wrapper(cfg):
-    """ Checks labels if they conform the rules. """
+    return cfg['loop'].run(tracing.in_span('check_labels', _solve_tasks(), incremental=incremental))
+
+def check_labels_stream(cfg, incremental=False, keepalive=15):
+    """ Checks labels and yields result of every repository as soon as it is checked. \
+        Yields (event, data) pairs: 'start' with number of repositories, 'repo' with result
+        and progress counters, 'failed' for failed service and 'done' with totals.
+        (None, None) is yielded when nothing happened for `keepalive` seconds. """
+    services = cfg['services']
+    labels_rules = rule_index(cfg)
+    events = queue.Queue()
+    total = sum(
+        len([reposlug for reposlug, enabled in service.repos.items() if enabled])
+        for service in services
+    )
+    counters = {'checked': 0, 'bad': 0, 'errors': 0}
+
+    def _on_progress(service, reposlug, violations):
+        events.put((service, reposlug, violations))
+
+    async def _solve_tasks():
+        tasks = []
+        for service in services:
+            task = asyncio.ensure_future(check_service(cfg, service, labels_rules, incremental, _on_progress))
+            tasks.append(task)
+
+        return await asyncio.gather(return_exceptions=True, *tasks)
+
+    yield 'start', {'total': total}
+    future = cfg['loop'].submit(tracing.in_span('check_labels', _solve_tasks(), incremental=incremental))
+    # Results are passed from the background loop to the web handler thread
+    future.add_done_callback(lambda _: events.put(None))
+    try:
+        while True:
+            try:
+                item = events.get(timeout=keepalive)
+            except queue.Empty:
+                yield None, None
+                continue
+            if item is None:
+                break
+
+            service, reposlug, violations = item
+            data = {'service': service.name, 'repository': reposlug}
+            if isinstance(violations, Exception):
+                counters['errors'] += 1
+                data.update(status='error', error=str(violations))
+            elif violations:
+                counters['bad'] += 1
+                data.update(status='bad', violations=len(violations))
+            else:
+                data.update(status='ok')
+            counters['checked'] += 1
+            data.update(counters, total=total)
+            yield 'repo', data
+
+        for result in future.result():
+            if isinstance(result, Exception):
+                yield 'failed', {'error': str(result)}
+        yield 'done', dict(counters, total=total)
+    finally:
+        # Client went away, don't keep checking for nobody
+        future.cancel()
+
+def plan_labels_stream(cfg, incremental=False, keepalive=15):
+    """ Makes reconciliation plans of all enabled repositories without changing them. \
+        Yields plan record of every repository as soon as it is checked, followed by one summary
+        record per service. None is yielded when nothing happened for `keepalive` seconds. """
     services = cfg['services']
-    labels_rules = cfg['cfg']
+    labels_rules = rule_index(cfg)
+    records = queue.Queue()
+    summaries = {service.name: {'targets': 0, 'operations': 0, 'api_calls': 0, 'errors': 0} for service in services}
+
+    def _on_record(record):
+        records.put(record)
+
     async def _solve_tasks():
         tasks = []
         for service in services:
-            task = asyncio.ensure_future(service.check_all(labels_rules))
+            task = asyncio.ensure_future(service.plan_all(labels_rules, incremental, _on_record))
             tasks.append(task)
 
+        return await asyncio.gather(return_exceptions=True, *tasks)
+
+    future = cfg['loop'].submit(tracing.in_span('plan_labels', _solve_tasks(), incremental=incremental))
+    # Records are passed from the background loop to the web handler thread
+    future.add_done_callback(lambda _: records.put(None))
+    try:
+        while True:
+            try:
+                record = records.get(timeout=keepalive)
+            except queue.Empty:
+                yield None
+                continue
+            if record is None:
+                break
+
+            summary = summaries[record['service']]
+            if 'operations' in record:
+                summary['targets'] += 1
+                summary['operations'] += len(record['operations'])
+                summary['api_calls'] += record['api_calls']
+            else:
+                summary['errors'] += 1
+            yield record
+
+        for result in future.result():
+            if isinstance(result, Exception):
+                yield {'error': str(result)}
+        for name, summary in summaries.items():
+            yield {'service': name, 'summary': summary}
+    finally:
+        # Client went away, don't keep planning for nobody
+        future.cancel()
+
+def validate_plan(services, records):
+    """ Checks plan records before anything of them is executed. \
+        Every record with operations must target an enabled repository (or managed GitLab group)
+        of a configured service and consist of known operations, ValueError is raised otherwise.
+        Records without operations, like summaries and errors of the plan, are ignored. """
+    services = {service.name: service for service in services}
+    for record in records:
+        if not isinstance(record, dict):
+            raise ValueError(f'Plan record {record!r} is not an object')
+        if 'operations' not in record:
+            continue
+        name = record.get('service')
+        service = services.get(name) if isinstance(name, str) else None
+        if not service:
+            raise ValueError(f'Unknown service {name!r}')
+        if not service.manages(record):
+            target = record.get('group', record.get('repository'))
+            raise ValueError(f'{target!r} is not enabled for {service.name}')
+        load_operations(record)
+
+def execute_plan_async_wrapper(cfg, records):
+    """ Executes plan records made by plan_labels_stream. \
+        ValueError is raised before anything is changed when some record is invalid. """
+    services = cfg['services']
+    validate_plan(services, records)
+    async def _solve_tasks():
+        tasks = []
+        for service in services:
+            service_records = [record for record in records if 'operations' in record and record['service'] == service.name]
+            if service_records:
+                task = asyncio.ensure_future(service.execute_plan(service_records))
+                tasks.append(task)
+
         results = await asyncio.gather(return_exceptions=True, *tasks)
         return results
 
-
-    asyncio.set_event_loop(asyncio.SelectorEventLoop())
-    loop = asyncio.get_event_loop()
-    results = loop.run_until_complete(_solve_tasks())
-    loop.close()
-    return results
+    return cfg['loop'].run(tracing.in_span('execute_plan', _solve_tasks(), records=len(records)))
 
 def get_repos_for_service_async_wrapper(service):
     """ Retrieves available repositories for given service. """
-    asyncio.set_event_loop(asyncio.SelectorEventLoop())
-    loop = asyncio.get_event_loop()
-    repos = asyncio.ensure_future(service.connector.get_repos())
-
-    results = loop.run_until_complete(repos)
-    loop.close()
-    return results
+    return service.run(service.get_repos())
 
 ENVVAR_CONFIG = 'LABELATORY_CONFIG'
 def load_web(app):
@@ -228,6 +525,37 @@ def create_app(config=None):
     app.config['cfg'] = cfg_
     app.config['services'] = services
     app.config['cfg_secret'] = cfg.source_secrete
+    app.config['pool'] = cfg.pool
+
+    # Every request submits its coroutines to one long-lived event loop
+    loop = BackgroundLoop()
+    app.config['loop'] = loop
+    for service in services:
+        service.loop = loop
+
+    # Webhook events are fixed by workers after the request is answered
+    cfg.webhooks.start(loop, services, lambda: rule_index(app.config))
+    app.config['webhooks'] = cfg.webhooks
+    for service in services:
+        service.queue = cfg.webhooks
+
+    # Drift missed by webhooks is found by periodic scans
+    if cfg.scanner:
+        cfg.scanner.start(loop, services, lambda: rule_index(app.config))
+    app.config['scanner'] = cfg.scanner
+    app.config['shards'] = cfg.shards
+    app.config['journal'] = cfg.journal
+
+    @atexit.register
+    def _shutdown():
+        tracing.tracer.close()
+        if cfg.scanner:
+            loop.run(cfg.scanner.stop(), timeout=5)
+        loop.run(cfg.webhooks.stop(), timeout=5)
+        loop.run(cfg.pool.close(), timeout=5)
+        loop.stop()
+        if cfg.shards:
+            cfg.shards.close()
 
     app.logger.info('Labelatory is completely loaded now.')
 
@@ -252,6 +580,7 @@ def create_app(config=None):
 
             if labels_rules.get(data['name']):
                 labels_rules.pop(data['name'])  
+                app.config.pop('rules', None)
 
                 response = app.response_class(
                             response='OK',
@@ -285,6 +614,7 @@ def create_app(config=None):
                 for key in sorted(app.config['cfg'].keys()):
                     cfg_[key] = app.config['cfg'][key]
                 app.config['cfg'] = cfg_
+                app.config.pop('rules', None)
             else:
                 response = app.response_class(
                     response=json.dumps({"error": "Such a label already defined."}),
@@ -318,6 +648,7 @@ def create_app(config=None):
             for key in sorted(app.config['cfg'].keys()):
                 cfg_[key] = app.config['cfg'][key]
             app.config['cfg'] = cfg_
+            app.config.pop('rules', None)
             return redirect(url_for('index'))
         else:
             return render_template(
@@ -336,7 +667,7 @@ def create_app(config=None):
                     # Once service is found, 
                     # process the request with webhook method of the service
                     if service.name == source:
-                        res = service.webhook(request, app.config['cfg'])
+                        res = service.webhook(request, rule_index(app.config))
                         return res
                 
         # If there is not 'x-*****-event' header
@@ -379,6 +710,51 @@ def create_app(config=None):
                     )
         return response
 
+    @app.route('/runs', methods=['GET'])
+    def fix_runs():
+        """ Returns checkpoints of the latest bulk fix runs. """
+        if not app.config['journal']:
+            return jsonify([])
+        return jsonify(app.config['journal'].runs())
+
+    @app.route('/pool', methods=['GET'])
+    def pool_stats():
+        """ Returns usage statistics of the HTTP connection pool. """
+        return jsonify(app.config['pool'].stats())
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics_():
+        """ Returns metrics in Prometheus text format. """
+        for service in app.config['services']:
+            connector = service.connector
+            limiters = {'rest': connector.limiter}
+            if getattr(connector, 'graphql_limiter', None):
+                limiters['graphql'] = connector.graphql_limiter
+            for api, limiter in limiters.items():
+                stats = limiter.stats()
+                if stats['limit'] is not None:
+                    metrics.RATE_LIMIT_LIMIT.set(stats['limit'], service=service.name, api=api)
+                    metrics.RATE_LIMIT_REMAINING.set(stats['remaining'], service=service.name, api=api)
+                if stats['reset_in'] is not None:
+                    metrics.RATE_LIMIT_RESET.set(stats['reset_in'], service=service.name, api=api)
+            if connector.cache is not None:
+                metrics.CACHE.set(connector.cache.hits, service=service.name, result='hit')
+                metrics.CACHE.set(connector.cache.misses, service=service.name, result='miss')
+        for state, value in app.config['webhooks'].stats().items():
+            if state in ('pending', 'collecting', 'merged', 'dropped_echoes'):
+                metrics.WEBHOOK_QUEUE.set(value, state=state)
+        for state, value in app.config['pool'].stats().items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                metrics.POOL.set(value, state=state)
+        return app.response_class(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+    @app.route('/scanner', methods=['GET'])
+    def scanner_stats():
+        """ Returns state of the scheduled drift scanner. """
+        if not app.config['scanner']:
+            abort(404)
+        return jsonify(app.config['scanner'].stats())
+
     @app.route('/repos', methods=['GET', 'POST'])
     def repos():
         """ Management of available repositories """
@@ -440,32 +816,119 @@ def create_app(config=None):
     #                 )
     #         return response
 
+    @app.route('/plan', methods=['GET', 'POST'])
+    def plan():
+        """ GET returns dry-run plan of fixes as JSON lines, POST executes such plan. """
+        if request.method == 'GET':
+            incremental = bool(distutils.util.strtobool(request.args.get('incremental', 'false')))
+            def _lines():
+                for record in plan_labels_stream(app.config, incremental):
+                    # Empty line keeps proxies from closing idle connection
+                    yield json.dumps(record) + '\n' if record is not None else '\n'
+            response = app.response_class(_lines(), mimetype='application/x-ndjson')
+            response.headers['X-Accel-Buffering'] = 'no'
+            return response
+        else:
+            try:
+                records = [json.loads(line) for line in request.get_data(as_text=True).splitlines() if line.strip()]
+                results = execute_plan_async_wrapper(app.config, records)
+            except ValueError as e:
+                abort(400, str(e))
+            data = {}
+            for result in results:
+                if isinstance(result, Exception):
+                    app.logger.error(f'Executing plan failed: {result}')
+                    continue
+                service, targets = result
+                data[service.name] = {
+                    target: str(solved) if isinstance(solved, Exception) else all(solved)
+                    for target, solved in targets.items()
+                }
+            return jsonify(data)
+
+    def _stream(events, ndjson):
+        """ Returns response streaming (event, data) pairs as Server-Sent Events or JSON lines. """
+        def _events():
+            for event, data in events:
+                if ndjson:
+                    if event:
+                        yield json.dumps(dict(data, event=event)) + '\n'
+                elif event:
+                    yield f'event: {event}\ndata: {json.dumps(data)}\n\n'
+                else:
+                    # Comment keeps proxies from closing idle connection
+                    yield ': keepalive\n\n'
+
+        response = app.response_class(
+            _events(),
+            mimetype='application/x-ndjson' if ndjson else 'text/event-stream'
+        )
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
+    @app.route('/check/labels/stream', methods=['GET'])
+    def check_labels_stream_():
+        """ Streams results of the check as Server-Sent Events, or as JSON lines \
+            when the client accepts application/x-ndjson. """
+        incremental = bool(distutils.util.strtobool(request.args.get('incremental', 'false')))
+        ndjson = request.accept_mimetypes.best == 'application/x-ndjson'
+        return _stream(check_labels_stream(app.config, incremental), ndjson)
+
     @app.route('/check/labels', methods=['GET', 'POST'])
     def check_labels():
         if request.method == 'GET':
-            check_results = check_labels_async_wrapper(app.config)
+            incremental = bool(distutils.util.strtobool(request.args.get('incremental', 'false')))
+            check_results = check_labels_async_wrapper(app.config, incremental)
             data = {}
+            errors = {}
             for result in check_results:
+                if isinstance(result, Exception):
+                    app.logger.error(f'Checking labels failed: {result}')
+                    continue
                 service, repos = result
                 if repos:
                     reposlugs = []
                     for reposlug, violations in repos.items():
-                        if violations:
+                        if isinstance(violations, Exception):
+                            # Report failed repository, others are still checked
+                            errors.setdefault(service.name, {})[reposlug] = str(violations)
+                        elif violations:
                             reposlugs.append(reposlug)
                     if reposlugs:
                         data[service.name] = reposlugs
+            if errors:
+                data['errors'] = errors
 
             print(data)
             return jsonify(data)
         else:
-            fix_results = fix_labels_async_wrapper(app.config)
+            resume = request.args.get('resume', 'true')
+            try:
+                resume = bool(distutils.util.strtobool(resume))
+            except ValueError:
+                # Id of the run to resume
+                journal = app.config['journal']
+                if not journal or not journal.exists(resume):
+                    abort(404, f'Fix run {resume} does not exist')
+            # Clients accepting a stream get result of every repository as soon as it is fixed
+            best = request.accept_mimetypes.best
+            try:
+                if best in ('text/event-stream', 'application/x-ndjson'):
+                    return _stream(fix_labels_stream(app.config, resume), best == 'application/x-ndjson')
+                fix_results = fix_labels_async_wrapper(app.config, resume=resume)
+            except RunInProgressError as e:
+                abort(409, str(e))
             data = {}
             for result in fix_results:
+                if isinstance(result, Exception):
+                    app.logger.error(f'Fixing labels failed: {result}')
+                    continue
                 service, repos = result
                 if repos:
                     reposlugs = []
                     for reposlug, fixes in repos.items():
-                        if all(fixes):
+                        if not isinstance(fixes, Exception) and all(fixes):
                             reposlugs.append(reposlug)
                     data[service.name] = reposlugs
 
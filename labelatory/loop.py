@@ -0,0 +1,31 @@
+import asyncio
+import threading
+
+
+class BackgroundLoop():
+    """ Long-lived event loop running in a daemon thread. \
+        Web handlers submit coroutines to it, so connections and caches
+        bound to the loop survive between requests. """
+
+    def __init__(self, name='labelatory-loop'):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """ Schedules coroutine on the loop and returns concurrent future of its result. """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        """ Runs coroutine on the loop and waits for its result. """
+        return self.submit(coro).result(timeout)
+
+    def stop(self, timeout=5):
+        """ Stops the loop and waits for its thread to finish. """
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout)
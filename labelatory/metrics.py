@@ -0,0 +1,199 @@
+import time
+import bisect
+import functools
+import threading
+import contextvars
+
+from contextlib import contextmanager
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric():
+    """ Metric with values per combination of label values. """
+
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labels)
+
+    def clear(self):
+        with self._lock:
+            self._values = {}
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in sorted(values):
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value):
+        return [f'{self.name}{_format_labels(self.labels, key)} {_format_value(value)}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """ Observes duration of the block. """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_value(self, key, value):
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            labels = _format_labels(self.labels, key, [('le', _format_value(bound))])
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = _format_labels(self.labels, key)
+        lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+        lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Registry():
+    """ Collection of metrics rendered in Prometheus text format. """
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+API_REQUESTS = REGISTRY.register(Counter(
+    'labelatory_api_requests_total', 'API requests sent by connectors.',
+    ('service', 'method', 'endpoint', 'status')
+))
+API_DURATION = REGISTRY.register(Histogram(
+    'labelatory_api_request_duration_seconds', 'Duration of API requests.',
+    ('service', 'method', 'endpoint')
+))
+API_RETRIES = REGISTRY.register(Counter(
+    'labelatory_api_retries_total', 'API requests repeated after a failed attempt.',
+    ('service', 'endpoint', 'reason')
+))
+RATE_LIMIT_WAIT = REGISTRY.register(Histogram(
+    'labelatory_rate_limit_wait_seconds', 'Time requests waited for the rate limiter.',
+    ('service',)
+))
+STAGE_DURATION = REGISTRY.register(Histogram(
+    'labelatory_stage_duration_seconds', 'Duration of scans, fixes and webhook events.',
+    ('service', 'stage')
+))
+RATE_LIMIT_REMAINING = REGISTRY.register(Gauge(
+    'labelatory_rate_limit_remaining', 'Requests left in the current rate limit window.',
+    ('service', 'api')
+))
+RATE_LIMIT_LIMIT = REGISTRY.register(Gauge(
+    'labelatory_rate_limit_limit', 'Requests allowed in one rate limit window.',
+    ('service', 'api')
+))
+RATE_LIMIT_RESET = REGISTRY.register(Gauge(
+    'labelatory_rate_limit_reset_seconds', 'Seconds until the rate limit window resets.',
+    ('service', 'api')
+))
+WEBHOOK_QUEUE = REGISTRY.register(Gauge(
+    'labelatory_webhook_queue', 'State of the webhook queue.',
+    ('state',)
+))
+CACHE = REGISTRY.register(Gauge(
+    'labelatory_response_cache', 'Lookups of the response cache.',
+    ('service', 'result')
+))
+POOL = REGISTRY.register(Gauge(
+    'labelatory_connection_pool', 'Usage of the HTTP connection pool.',
+    ('state',)
+))
+
+
+# Stages measured by the current task, so overriding methods calling super are measured once
+_active_stages = contextvars.ContextVar('labelatory_active_stages', default=frozenset())
+
+
+def timed(stage):
+    """ Decorates coroutine method of a service to observe its duration as the stage. """
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            key = (self.name, stage)
+            active = _active_stages.get()
+            if key in active:
+                return await method(self, *args, **kwargs)
+            token = _active_stages.set(active | {key})
+            try:
+                with STAGE_DURATION.time(service=self.name, stage=stage):
+                    return await method(self, *args, **kwargs)
+            finally:
+                _active_stages.reset(token)
+        return wrapper
+    return decorator
@@ -0,0 +1,182 @@
+import re
+
+from difflib import SequenceMatcher
+
+from .label import Label
+from .rules import RuleIndex, normalize_color, normalize_description
+
+
+class Operation():
+    """ Single write needed to reconcile labels of repository with the rules. \
+        Type is 'update', 'rename', 'delete' or 'create'. The label holds the wanted state,
+        old_name is the name of the label in repository before the operation. """
+
+    def __init__(self, type, label, old_name=None, before=None):
+        self.type = type
+        self.label = label
+        self.old_name = old_name or label.name
+        # Label as it was in repository when the plan was made
+        self.before = before
+
+    def to_dict(self):
+        """ Returns JSON serializable form of the operation with values before and after it. """
+        return {
+            'type': self.type,
+            'old_name': self.old_name,
+            'before': _label_dict(self.before),
+            'after': None if self.type == 'delete' else _label_dict(self.label)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """ Loads operation saved by to_dict. """
+        before = _load_label(data.get('before'))
+        label = before if data['type'] == 'delete' else _load_label(data['after'])
+        return Operation(data['type'], label, data.get('old_name'), before)
+
+    def __repr__(self):
+        if self.type == 'rename':
+            return f'Operation(rename {self.old_name!r} -> {self.label.name!r})'
+        return f'Operation({self.type} {self.label.name!r})'
+
+
+def _label_dict(label):
+    if label is None:
+        return None
+    return {
+        'name': label.name,
+        'color': label.color,
+        'description': label.description,
+        'inherited': label.inherited
+    }
+
+
+def _load_label(data):
+    if data is None:
+        return None
+    return Label(data['name'], data['color'], data['description'], data.get('inherited', False))
+
+
+# Order in which operations of one repository are executed:
+# existing labels are updated and renamed before extra ones are removed and missing ones created
+OPERATION_ORDER = {'update': 0, 'rename': 0, 'delete': 1, 'create': 2}
+
+# Minimal similarity of names of extra and missing label for the extra one to be renamed
+RENAME_THRESHOLD = 0.8
+
+
+def _name(name):
+    """ Returns name ignoring case and the separator of words. """
+    return ' '.join(re.split(r'[\s_:/-]+', name.lower())).strip()
+
+
+def _similarity(label, rule):
+    """ Scores how likely the label is the rule under another name. \
+        Only similar names qualify, equal color and equal non-empty description break ties.
+        Returns None for labels which are not similar enough to be renamed. """
+    ratio = SequenceMatcher(None, _name(label.name), _name(rule.name)).ratio()
+    if ratio < RENAME_THRESHOLD:
+        return None
+    score = ratio
+    if normalize_color(label.color) == normalize_color(rule.color):
+        score += 0.5
+    description = normalize_description(label.description)
+    if description and description == normalize_description(rule.description):
+        score += 0.5
+    return score
+
+
+def _renames(extra, missing):
+    """ Pairs extra labels with missing rules they most likely are renamed versions of. """
+    candidates = []
+    for label in extra:
+        for rule in missing:
+            score = _similarity(label, rule)
+            if score is not None:
+                candidates.append((score, label.name, rule.name, label, rule))
+
+    renames = []
+    used_labels, used_rules = set(), set()
+    for score, _, _, label, rule in sorted(candidates, key=lambda c: (-c[0], c[1], c[2])):
+        if label.name in used_labels or rule.name in used_rules:
+            continue
+        used_labels.add(label.name)
+        used_rules.add(rule.name)
+        renames.append((label, rule))
+    return renames
+
+
+def build_plan(labels_rules, violations):
+    """ Returns minimal list of operations solving violations of one repository. \
+        Color and description of one label are fixed by single update,
+        extra labels resembling missing ones are renamed instead of removed and created again
+        and duplicate violations are solved once. """
+    labels_rules = RuleIndex.of(labels_rules)
+    updates = {}
+    extra = {}
+    missing = {}
+    for violation in violations:
+        label = violation.label
+        if violation.type in ('color', 'description'):
+            updates.setdefault(label.name, label)
+        elif violation.type == 'extra':
+            extra.setdefault(label.name, label)
+        elif violation.type == 'missing':
+            missing.setdefault(violation.required or label.name, label)
+
+    operations = []
+    for name, label in updates.items():
+        rule = labels_rules[name]
+        operations.append(Operation(
+            'update', Label(name, rule.color, rule.description, label.inherited), before=label
+        ))
+
+    for label, rule in _renames(extra.values(), missing.values()):
+        del extra[label.name]
+        del missing[rule.name]
+        operations.append(Operation(
+            'rename', Label(rule.name, rule.color, rule.description, label.inherited), label.name, label
+        ))
+
+    operations.extend(Operation('delete', label, before=label) for label in extra.values())
+    operations.extend(
+        Operation('create', Label(rule.name, rule.color, rule.description))
+        for rule in missing.values()
+    )
+    operations.sort(key=lambda operation: OPERATION_ORDER[operation.type])
+    return operations
+
+
+def load_operations(record):
+    """ Loads operations of plan record made by plan_record. \
+        ValueError is raised for records which are not such plans. """
+    if not isinstance(record.get('operations'), list):
+        raise ValueError('Plan record has no list of operations')
+    operations = []
+    for data in record['operations']:
+        if not isinstance(data, dict) or data.get('type') not in OPERATION_ORDER:
+            raise ValueError(f'Unknown operation {data!r}')
+        try:
+            operation = Operation.from_dict(data)
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f'Malformed operation {data!r}') from e
+        label = operation.label
+        if label is None or not isinstance(label.name, str) or not isinstance(operation.old_name, str):
+            raise ValueError(f'Malformed operation {data!r}')
+        operations.append(operation)
+    return operations
+
+
+def plan_record(service, operations, repository=None, group=None):
+    """ Returns plan of one repository (or GitLab group) as a JSON serializable record. \
+        Every operation is one write request, so it also estimates the API calls executing
+        the saved plan needs. Requests reading labels to make the plan are not counted,
+        a new check needs one per page of labels of every repository and group. """
+    record = {'service': service}
+    if group:
+        record['group'] = group
+    else:
+        record['repository'] = repository
+    record['operations'] = [operation.to_dict() for operation in operations]
+    record['api_calls'] = len(operations)
+    return record
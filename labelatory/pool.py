@@ -0,0 +1,109 @@
+import asyncio
+import aiohttp
+
+
+class ConnectionPool():
+    """ Process-wide pool of HTTP connections shared by all services. \
+        Keeps connections alive between requests, limits connections per host
+        and caches DNS lookups. Sessions are created per set of headers,
+        so every service uses its own credentials over the same connections. """
+
+    def __init__(self, limit=100, limit_per_host=20, keepalive_timeout=30, ttl_dns_cache=300):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+
+        self._loop = None
+        self._connector = None
+        self._sessions = {}
+
+        self._requests = 0
+        self._created = 0
+        self._reused = 0
+
+        self._trace = aiohttp.TraceConfig()
+        self._trace.on_request_start.append(self._on_request_start)
+        self._trace.on_connection_create_end.append(self._on_connection_create_end)
+        self._trace.on_connection_reuseconn.append(self._on_connection_reuseconn)
+
+    async def _on_request_start(self, session, context, params):
+        self._requests += 1
+
+    async def _on_connection_create_end(self, session, context, params):
+        self._created += 1
+
+    async def _on_connection_reuseconn(self, session, context, params):
+        self._reused += 1
+
+    def _bind(self, loop):
+        """ Creates connector for given event loop. Connections of another loop can't be reused. """
+        # Sessions of the previous loop are switched to closed state, so they are not reported unclosed
+        for session in self._sessions.values():
+            session.detach()
+        if self._connector and not self._connector.closed and self._loop and self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._connector.close(), self._loop)
+        self._loop = loop
+        self._sessions = {}
+        self._connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.ttl_dns_cache
+        )
+
+    def session(self, headers):
+        """ Returns session with given headers using the shared connections. """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._connector.closed:
+            self._bind(loop)
+
+        key = tuple(sorted(headers.items()))
+        session = self._sessions.get(key)
+        if session is None or session.closed:
+            session = aiohttp.ClientSession(
+                connector=self._connector,
+                connector_owner=False,
+                headers=headers,
+                trace_configs=[self._trace]
+            )
+            self._sessions[key] = session
+        return session
+
+    async def close(self):
+        """ Closes all sessions and connections of the pool. """
+        for session in self._sessions.values():
+            await session.close()
+        self._sessions = {}
+        if self._connector:
+            await self._connector.close()
+
+    def stats(self):
+        """ Returns statistics of the pool usage. """
+        idle = 0
+        in_use = 0
+        if self._connector and not self._connector.closed:
+            idle = sum(len(conns) for conns in getattr(self._connector, '_conns', {}).values())
+            in_use = len(getattr(self._connector, '_acquired', ()))
+        connections = self._created + self._reused
+        return {
+            'limit': self.limit,
+            'limit_per_host': self.limit_per_host,
+            'open_connections': idle + in_use,
+            'idle_connections': idle,
+            'used_connections': in_use,
+            'requests': self._requests,
+            'created_connections': self._created,
+            'reused_connections': self._reused,
+            'reuse_ratio': self._reused / connections if connections else 0.0
+        }
+
+    @classmethod
+    def load(cls, cfg):
+        """ Loads pool settings from 'pool' section of configuration. """
+        return ConnectionPool(
+            limit=cfg.getint('pool', 'limit', fallback=100),
+            limit_per_host=cfg.getint('pool', 'limit_per_host', fallback=20),
+            keepalive_timeout=cfg.getint('pool', 'keepalive_timeout', fallback=30),
+            ttl_dns_cache=cfg.getint('pool', 'ttl_dns_cache', fallback=300)
+        )
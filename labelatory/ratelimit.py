@@ -0,0 +1,166 @@
+import time
+import heapq
+import asyncio
+import itertools
+import contextvars
+
+
+# Priorities of API requests, lower value is served first
+WEBHOOK = 0
+BULK = 1
+
+# Priority of requests sent by the current task
+priority = contextvars.ContextVar('labelatory_priority', default=BULK)
+
+
+class RateLimiter():
+    """ Schedules API requests of one service according to its rate limit. \
+        The budget is taken from rate limit headers of the responses (GitHub X-RateLimit-*,
+        GitLab RateLimit-*). While the remaining budget is above the reserve, requests are sent
+        immediately; below it, they are paced evenly until the limit resets.
+        Waiting requests are served by priority, so webhook fixes overtake bulk scans. """
+
+    HEADER_PREFIXES = ('X-RateLimit-', 'RateLimit-')
+
+    def __init__(self, reserve=0.1, max_backoff=60):
+        self.reserve = reserve
+        self.max_backoff = max_backoff
+
+        self.limit = None
+        self.remaining = None
+        self._reset_at = None
+        self._blocked_until = 0
+        self._last_sent = 0
+
+        self._waiters = []
+        self._counter = itertools.count()
+        self._timer = None
+        self._loop = None
+
+    def _header(self, headers, name):
+        for prefix in self.HEADER_PREFIXES:
+            value = headers.get(prefix + name)
+            if value is not None:
+                return value
+        return None
+
+    def _delay(self, now):
+        """ Returns how long the next request has to wait. """
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if self.remaining is None:
+            return 0
+        if self._reset_at is not None and now >= self._reset_at:
+            # Limit window is over, the budget is full again
+            self.remaining = self.limit
+            self._reset_at = None
+            return 0
+        if self.remaining > self.limit * self.reserve:
+            return 0
+        if self._reset_at is None:
+            return 0
+        if self.remaining <= 0:
+            return self._reset_at - now
+        interval = (self._reset_at - now) / self.remaining
+        return max(0, self._last_sent + interval - now)
+
+    def _dispatch(self):
+        """ Lets waiting requests go in order of their priority while the budget allows. """
+        self._timer = None
+        while self._waiters:
+            future = self._waiters[0][2]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            now = time.monotonic()
+            delay = self._delay(now)
+            if delay > 0:
+                self._timer = self._loop.call_later(delay, self._dispatch)
+                return
+            heapq.heappop(self._waiters)
+            self._last_sent = now
+            if self.remaining is not None:
+                self.remaining -= 1
+            future.set_result(None)
+
+    def _reschedule(self):
+        if self._timer:
+            self._timer.cancel()
+        if self._loop and not self._loop.is_closed():
+            self._dispatch()
+
+    async def acquire(self, request_priority=None):
+        """ Waits until a request may be sent. """
+        if request_priority is None:
+            request_priority = priority.get()
+
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Waiters and timers of another loop can't be served anymore
+            self._loop = loop
+            self._waiters = []
+            self._timer = None
+
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (request_priority, next(self._counter), future))
+        if self._timer is None:
+            self._dispatch()
+        await future
+
+    def update(self, headers):
+        """ Updates the budget from rate limit headers of a response. """
+        limit = self._header(headers, 'Limit')
+        remaining = self._header(headers, 'Remaining')
+        reset = self._header(headers, 'Reset')
+        if limit is None or remaining is None:
+            return
+        self.limit = int(limit)
+        self.remaining = int(remaining)
+        if reset is not None:
+            self._reset_at = time.monotonic() + max(0, int(reset) - time.time())
+        self._reschedule()
+
+    def is_limited(self, status, headers, text=''):
+        """ Tells whether the response was rejected because of a rate limit. """
+        if status == 429:
+            return True
+        if status == 403:
+            return (
+                headers.get('Retry-After') is not None
+                or self._header(headers, 'Remaining') == '0'
+                or 'rate limit' in text.lower()
+            )
+        return False
+
+    def backoff(self, headers, attempt):
+        """ Blocks all requests after a rate limited response and returns the waiting time. """
+        retry_after = headers.get('Retry-After')
+        if retry_after is not None:
+            delay = float(retry_after)
+        elif self._header(headers, 'Remaining') == '0' and self._reset_at is not None:
+            delay = self._reset_at - time.monotonic()
+        else:
+            # Secondary rate limit without hints, back off exponentially
+            delay = 2 ** attempt
+        delay = min(max(delay, 1), self.max_backoff)
+        self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+        self._reschedule()
+        return delay
+
+    def stats(self):
+        """ Returns current state of the rate limit budget. """
+        return {
+            'limit': self.limit,
+            'remaining': self.remaining,
+            'reset_in': max(0, self._reset_at - time.monotonic()) if self._reset_at else None,
+            'blocked_for': max(0, self._blocked_until - time.monotonic()),
+            'waiting': len(self._waiters)
+        }
+
+    @classmethod
+    def load(cls, cfg, section):
+        """ Loads limiter settings of a service section of configuration. """
+        return RateLimiter(
+            reserve=cfg.getfloat(section, 'rate_limit_reserve', fallback=0.1),
+            max_backoff=cfg.getint(section, 'rate_limit_max_backoff', fallback=60)
+        )
@@ -0,0 +1,89 @@
+import time
+import random
+
+from .errors import CircuitOpenError
+
+
+class RetryPolicy():
+    """ Decides which failed requests are repeated and how long to wait before that. \
+        Idempotent requests are repeated after transient failures. Other requests could be
+        applied twice, so they are repeated only when they surely did not reach the server.
+        Waiting time grows exponentially with full jitter, so clients don't retry in lockstep. """
+
+    IDEMPOTENT_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'))
+
+    def __init__(self, retries=3, base_delay=0.5, max_delay=30, circuit_threshold=5, circuit_reset=30):
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # Settings of circuit breakers of the hosts
+        self.circuit_threshold = circuit_threshold
+        self.circuit_reset = circuit_reset
+
+    def should_retry(self, method, error, attempt, idempotent=None, sent=True):
+        """ Tells whether request failed with the error can be repeated. """
+        if attempt >= self.retries or not error.retryable:
+            return False
+        if idempotent is None:
+            idempotent = method in self.IDEMPOTENT_METHODS
+        return idempotent or not sent
+
+    def delay(self, attempt):
+        """ Returns seconds to wait before the next attempt. """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    @classmethod
+    def load(cls, cfg, section):
+        """ Loads retry settings of a service section of configuration. """
+        return RetryPolicy(
+            retries=cfg.getint(section, 'retries', fallback=3),
+            base_delay=cfg.getfloat(section, 'retry_base_delay', fallback=0.5),
+            max_delay=cfg.getfloat(section, 'retry_max_delay', fallback=30),
+            circuit_threshold=cfg.getint(section, 'circuit_threshold', fallback=5),
+            circuit_reset=cfg.getfloat(section, 'circuit_reset', fallback=30)
+        )
+
+
+class CircuitBreaker():
+    """ Stops sending requests to a host after `threshold` consecutive transient failures. \
+        After `reset_timeout` seconds one trial request is let through,
+        its success closes the circuit again, its failure keeps it open. """
+
+    def __init__(self, host, threshold=5, reset_timeout=30):
+        self.host = host
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def before_request(self):
+        """ Raises CircuitOpenError when the request must not be sent. """
+        state = self.state
+        if state == 'open' or (state == 'half-open' and self._trial):
+            raise CircuitOpenError(f'Circuit of {self.host} is open after {self.failures} failures')
+        if state == 'half-open':
+            self._trial = True
+
+    def success(self):
+        self.failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    def release(self):
+        """ Ends trial request which neither succeeded nor failed, so another one can be sent. """
+        self._trial = False
+
+    def failure(self):
+        self.failures += 1
+        if self._trial or self.failures >= self.threshold:
+            self._opened_at = time.monotonic()
+        self._trial = False
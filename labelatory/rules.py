@@ -0,0 +1,108 @@
+import hashlib
+
+from collections.abc import Mapping
+from types import MappingProxyType
+
+from .label import Violation
+
+
+def normalize_description(description):
+    """ Returns description with missing one treated as empty. """
+    return description or ''
+
+
+def normalize_color(color):
+    """ Returns color as lowercase hex without leading '#'. """
+    if not color:
+        return ''
+    return color.lstrip('#').lower()
+
+
+def _label_hash(name, color, description):
+    digest = hashlib.blake2b(f'{name}\0{color}\0{description}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def fingerprint(labels):
+    """ Returns order independent fingerprint of set of labels. \
+        Labels differing only in color case, '#' or missing description have equal fingerprints. """
+    total = 0
+    for label in labels:
+        total += _label_hash(label.name, normalize_color(label.color), normalize_description(label.description))
+    return f'{total & 0xffffffffffffffff:016x}{len(labels):x}'
+
+
+class RuleIndex(Mapping):
+    """ Immutable index of label rules compiled once for many repositories. \
+        Behaves as read-only mapping of label names to rules. Colors are normalised,
+        conforming labels are recognised by their (name, color, description) fingerprint
+        and missing labels are found as difference of name sets. """
+
+    def __init__(self, labels_rules):
+        self._rules = MappingProxyType(dict(labels_rules))
+        self.names = frozenset(self._rules)
+        self._colors = {name: normalize_color(rule.color) for name, rule in self._rules.items()}
+        self._fingerprints = frozenset(
+            (name, self._colors[name], normalize_description(rule.description))
+            for name, rule in self._rules.items()
+        )
+        self.fingerprint = fingerprint(self._rules.values())
+
+    @classmethod
+    def of(cls, labels_rules):
+        """ Returns index of the rules, compiling them unless they already are compiled. """
+        if isinstance(labels_rules, RuleIndex):
+            return labels_rules
+        return RuleIndex(labels_rules)
+
+    def __getitem__(self, name):
+        return self._rules[name]
+
+    def __iter__(self):
+        return iter(self._rules)
+
+    def __len__(self):
+        return len(self._rules)
+
+    def check_label(self, label):
+        """ Returns violations of single label. """
+        name = label.name
+        if name not in self.names:
+            return [Violation('extra', label, name)]
+
+        color = normalize_color(label.color)
+        description = normalize_description(label.description)
+        if (name, color, description) in self._fingerprints:
+            return []
+
+        rule = self._rules[name]
+        violations = []
+        if color != self._colors[name]:
+            violations.append(Violation('color', label, color, rule.color))
+        if description != normalize_description(rule.description):
+            violations.append(Violation('description', label, label.description, rule.description))
+        return violations
+
+    def conforms(self, labels_fingerprint):
+        """ Tells whether labels with given fingerprint match the rules exactly. """
+        return labels_fingerprint == self.fingerprint
+
+    def evaluate(self, labels, labels_fingerprint=None):
+        """ Returns violations of labels of one repository, including missing labels. \
+            Labels whose fingerprint matches the rules are not compared one by one. """
+        if labels_fingerprint is None:
+            labels_fingerprint = fingerprint(labels)
+        if self.conforms(labels_fingerprint):
+            return []
+
+        violations = []
+        for label in labels:
+            violations.extend(self.check_label(label))
+
+        missing = self.names.difference(label.name for label in labels)
+        if missing:
+            violations.extend(
+                Violation('missing', rule, required=name)
+                for name, rule in self._rules.items() if name in missing
+            )
+        return violations
@@ -0,0 +1,136 @@
+import time
+import random
+import asyncio
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+class DriftScanner():
+    """ Periodically checks all enabled repositories on the background loop. \
+        Repositories are spread evenly across the interval with random jitter,
+        so the API sees steady load instead of a burst every cycle.
+        Drifted repositories are either reported or fixed, according to the mode. """
+
+    MODES = ('report', 'fix')
+
+    def __init__(self, interval=3600, mode='report', incremental=True, jitter=0.5):
+        if mode not in self.MODES:
+            raise Exception(f'Scanner mode can be only {" or ".join(self.MODES)}!')
+        self.interval = interval
+        self.mode = mode
+        self.incremental = incremental
+        self.jitter = jitter
+        self.loop = None
+        self.services = []
+        self.rules = None
+        self._task = None
+
+        self.cycles = 0
+        self.cycle_started = None
+        self.checked = 0
+        self.drifted = {}
+        self.errors = {}
+
+    def start(self, loop, services, rules):
+        """ Starts scanning on the background loop. \
+            rules() returns rules for labels at the time the repository is checked. """
+        self.loop = loop
+        self.services = services
+        self.rules = rules
+        loop.run(self._start())
+
+    async def _start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    def _schedule(self):
+        """ Returns (offset, service, reposlug) of every enabled repository within one cycle. """
+        repos = [
+            (service, reposlug)
+            for service in self.services
+            for reposlug, enabled in service.repos.items() if enabled
+        ]
+        if not repos:
+            return []
+        # Shuffled order keeps repositories of one service from being scanned back to back
+        random.shuffle(repos)
+        slot = self.interval / len(repos)
+        return [
+            (index * slot + random.uniform(0, self.jitter) * slot, service, reposlug)
+            for index, (service, reposlug) in enumerate(repos)
+        ]
+
+    async def _run(self):
+        while True:
+            started = time.monotonic()
+            await self._cycle(started)
+            # Next cycle starts one interval after the previous one, even if it finished early
+            await asyncio.sleep(max(0, started + self.interval - time.monotonic()))
+
+    async def _cycle(self, started):
+        self.cycles += 1
+        self.cycle_started = time.time()
+        self.checked = 0
+        semaphores = {service.name: asyncio.Semaphore(service.concurrency) for service in self.services}
+        tasks = []
+        for offset, service, reposlug in self._schedule():
+            await asyncio.sleep(max(0, started + offset - time.monotonic()))
+            tasks.append(asyncio.ensure_future(self._scan(service, reposlug, semaphores[service.name])))
+        await asyncio.gather(*tasks)
+
+    async def _scan(self, service, reposlug, semaphore):
+        key = f'{service.name}:{reposlug}'
+        labels_rules = self.rules()
+        async with semaphore:
+            try:
+                violations = await service.check_repo(reposlug, labels_rules, self.incremental)
+                if violations and self.mode == 'fix':
+                    _, results = await service.fix_all(labels_rules, {reposlug: violations})
+                    if isinstance(results[reposlug], Exception):
+                        raise results[reposlug]
+                    logger.info(f'Scanner fixed {len(violations)} violations of {key}')
+                elif violations:
+                    logger.warning(f'Scanner found {len(violations)} violations of {key}')
+            except Exception as e:
+                logger.error(f'Scanner failed to check {key}: {e}')
+                self.errors[key] = str(e)
+                return
+
+        self.checked += 1
+        self.errors.pop(key, None)
+        if violations and self.mode == 'report':
+            self.drifted[key] = len(violations)
+        else:
+            self.drifted.pop(key, None)
+
+    async def stop(self):
+        """ Stops scanning. """
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self):
+        return {
+            'interval': self.interval,
+            'mode': self.mode,
+            'cycles': self.cycles,
+            'cycle_started': self.cycle_started,
+            'checked': self.checked,
+            'drifted': self.drifted,
+            'errors': self.errors
+        }
+
+    @classmethod
+    def load(cls, cfg):
+        """ Loads scanner from 'scanner' section of configuration, if there is one. """
+        interval = cfg.getint('scanner', 'interval', fallback=0)
+        if not interval:
+            return None
+        return DriftScanner(
+            interval=interval,
+            mode=cfg.get('scanner', 'mode', fallback='report'),
+            incremental=cfg.getboolean('scanner', 'incremental', fallback=True),
+            jitter=cfg.getfloat('scanner', 'jitter', fallback=0.5)
+        )
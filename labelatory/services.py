@@ -1,138 +1,341 @@
-import aiohttp
 import asyncio
 import hmac
 import hashlib
 
 from .label import *
 from .connector import GitHubConnector, GitLabConnector
+from .pool import ConnectionPool
+from .rules import RuleIndex, fingerprint
+from .plan import Operation, build_plan, plan_record
+from .ratelimit import RateLimiter, priority, WEBHOOK
+from .retry import RetryPolicy
+from .metrics import timed
+from .tracing import span, traced
 from flask import Flask, url_for, render_template, request, abort, redirect, jsonify
 from flask.wrappers import Response
 
 class Service():
-    def __init__(self, name, token, secret, repos):
+
+    # Default number of repositories processed at the same time
+    DEFAULT_CONCURRENCY = 10
+
+    def __init__(self, name, token, secret, repos, concurrency=None, pool=None):
         self.name = name
         self.token = token
         self.secret = secret
         self.repos = repos
-        
+        self.concurrency = concurrency or self.DEFAULT_CONCURRENCY
+        self.pool = pool or ConnectionPool()
+        self.loop = None
+        self.store = None
+        self.queue = None
+
+    def run(self, coro):
+        """ Runs coroutine on the background loop of the application if there is one. """
+        if self.loop:
+            return self.loop.run(coro)
+        return asyncio.run(self._run_once(coro))
+
+    async def _run_once(self, coro):
+        """ Awaits coroutine on a temporary loop, closing connections which can't outlive it. """
+        try:
+            return await coro
+        finally:
+            await self.pool.close()
+
+    @timed('webhook')
+    @traced('handle_event')
+    async def handle_event(self, event, labels_rules):
+        """ Fixes labels of repository reported by webhook event. """
+        # Webhook fixes are served before bulk scans
+        priority.set(WEBHOOK)
+        repository = event['repository']
+        if self.store:
+            # Labels of repository have changed, fetch them on next check
+            self.store.mark_dirty(self.name, repository)
+        # Merged events carry action of every label
+        actions = {}
+        for label in event['labels']:
+            label = dict(label)
+            action = label.pop('action', event['action'])
+            actions.setdefault(action, []).append(Label(**label))
+
+        results = []
+        for action, labels in actions.items():
+            results.append(await self.fix_labels(repository, labels_rules, labels, action))
+        return all(results)
+
+    def process_event(self, event, labels_rules):
+        """ Enqueues webhook event and accepts it at once. \
+            Without queue the event is processed before responding. """
+        if self.queue:
+            self.queue.put(self, event)
+            return Response(response='Accepted', status=202)
+
+        if self.run(self.handle_event(event, labels_rules)):
+            return Response(response='OK', status=200)
+        else:
+            return Response(response='Something wrong', status=500)
+
+    def _use_session(self):
+        """ Provides the connector with pooled session of this service. """
+        self.connector.session = self.pool.session(self._headers)
+
     
+    async def get_repos(self):
+        """ Retrieves repositories available to the service account. """
+        self._use_session()
+        return await self.connector.get_repos()
+
     async def fix_labels(self, reposlug, labels_rules, labels=None, action=None):
         """ Checks single label. If only name is provided, gets the label from the service. """
-        async with aiohttp.ClientSession(headers=self._headers) as session:
-            labels_rules_copy = labels_rules.copy()
-            results = []
-            for label in labels:
-                label_name = label.name
-                label_rule = labels_rules_copy.get(label_name)
-
-                if label_rule:
-                    if action == 'deleted':
-                        results.append(await self.fix_violation(labels_rules, reposlug, Violation('missing', label, required=label.name)))
-                    
-                    # Get parameters of retrieved label
-                    label_color = label.color
-                    label_description = label.description
-                    if label_color[0] == '#':
-                        label_color = label_color[1:]
-                    
-                    # Check label parameters
-                    if label_color != label_rule.color[1:]:
-                        right_color = label_rule.color
-                        results.append(await self.fix_violation(labels_rules, reposlug, Violation('color', label, label_color, right_color)))
-                    else:
-                        results.append(True)
-                    if label_description != label_rule.description:
-                        right_description = label_rule.description
-                        results.append(await self.fix_violation(labels_rules, reposlug, Violation('description', label, label_description, right_description)))
-                    else:
-                        results.append(True)
-                    # Remove checked label from rules for this reposlug
-                    labels_rules_copy.pop(label_name)
-                else:
-                    # violations.append(Violation('extra', label, label_name))
-                    results.append(await self.fix_violation(labels_rules, reposlug, Violation('extra', label, label_name)))
-
-            return all(results)
-
-
-    async def check_all(self, labels_rules):
-        async with aiohttp.ClientSession(headers=self._headers) as session:
-            self.connector.session = session
-
-            results = {}
-
-            for reposlug, enabled in self.repos.items():
-                if enabled:
-                    labels_rules_copy = labels_rules.copy()
-                    labels = await self.connector.get_labels(reposlug)
-
-                    # Loop on every label in current repository
-                    violations = []
-                    for label in labels:
-                        label_name = label.name
-                        label_rule = labels_rules_copy.get(label_name)
-
-                        if label_rule:
-                            # Get parameters of retrieved label
-                            label_color = label.color
-                            label_description = label.description
-                            if label_color[0] == '#':
-                                label_color = label_color[1:]
-                            # Check label parameters
-                            if label_color != label_rule.color[1:]:
-                                right_color = label_rule.color
-                                violations.append(Violation('color', label, label_color, right_color))
-                            if label_description != label_rule.description:
-                                right_description = label_rule.description
-                                violations.append(Violation('description', label, label_description, right_description))
-                            # Remove checked label from rules for this reposlug
-                            labels_rules_copy.pop(label_name)
-                        else:
-                            violations.append(Violation('extra', label, label_name))
-                        
-                    # Include missing labels
-                    violations.extend([Violation('missing', label, required=label.name) for label in labels_rules_copy.values()])
-                    
-                    # Update results for this service
-                    results.update({reposlug: violations})
-            return (self, results)
+        self._use_session()
+        labels_rules = RuleIndex.of(labels_rules)
+        violations = []
+        for label in labels:
+            if action == 'deleted' and label.name in labels_rules:
+                # Restore deleted label as the rule defines it
+                violations.append(Violation('missing', labels_rules[label.name], required=label.name))
+                continue
+            violations.extend(labels_rules.check_label(label))
 
-    async def fix_violation(self, labels_rules, reposlug, violation):
-        async with aiohttp.ClientSession(headers=self._headers) as session:
-            self.connector.session = session
-            if violation.type == 'color':
-                # Update label with right color
-                correct_label = labels_rules.get(violation.label.name)
-                violation.label.color = correct_label.color
-                await self.connector.update_label(reposlug, violation.label)
-            elif violation.type == 'description':
-                # Update label with right description
-                correct_label = labels_rules.get(violation.label.name)
-                violation.label.description = correct_label.description
-                await self.connector.update_label(reposlug, violation.label)
-            elif violation.type == 'extra':
-                # Delete extra label
-                await self.connector.remove_label(reposlug, violation.label)
-            elif violation.type == 'missing':
-                # Create missing label
-                await self.connector.create_label(reposlug, violation.label)
+        return all(await self.fix_repo(labels_rules, reposlug, violations))
+
+
+    async def get_labels(self, reposlug, incremental=False):
+        """ Retrieves labels of repository and remembers them in the store. \
+            In incremental mode fresh stored labels are used instead of fetching them. """
+        if incremental and self.store and self.store.is_fresh(self.name, reposlug):
+            return self.store.load_labels(self.name, reposlug)
+        labels = await self.connector.get_labels(reposlug)
+        self._remember_labels(reposlug, labels)
+        return labels
+
+    def _remember_labels(self, reposlug, labels):
+        if self.store:
+            self.store.save_labels(self.name, reposlug, labels, fingerprint(labels))
+
+    async def prefetch_labels(self, reposlugs):
+        """ Retrieves labels of many repositories at once, if the service can do it. \
+            Returns labels or exception for every prefetched repository. """
+        return {}
+
+    async def check_repo(self, reposlug, labels_rules, incremental=False, labels=None):
+        """ Checks labels of a single repository against the rules. \
+            Repository whose label set fingerprint matches the rules is compliant without diffing.
+            Already fetched labels of the repository may be given. """
+        labels_rules = RuleIndex.of(labels_rules)
+        if labels is not None:
+            self._remember_labels(reposlug, labels)
+            return labels_rules.evaluate(labels)
+        if incremental and self.store and self.store.is_fresh(self.name, reposlug):
+            # Unchanged repository which was compliant last time needs no work at all
+            if labels_rules.conforms(self.store.get_fingerprint(self.name, reposlug)):
+                return []
+        self._use_session()
+        with span('check_repo', service=self.name, repository=reposlug) as span_:
+            labels = await self.get_labels(reposlug, incremental)
+            violations = labels_rules.evaluate(labels)
+            span_.set_attribute('labels', len(labels))
+            span_.set_attribute('violations', len(violations))
+        return violations
+
+    @timed('check_all')
+    @traced('check_all')
+    async def check_all(self, labels_rules, incremental=False, on_progress=None, skip=()):
+        """ Checks all enabled repositories concurrently, at most `concurrency` at a time. \
+            Failure of a repository is stored as its result and does not cancel the others.
+            In incremental mode only dirty or stale repositories are fetched.
+            Repositories in skip, e.g. already fixed by a resumed run, are left out.
+            on_progress(service, reposlug, result) is called once a repository is checked. """
+        self._use_session()
+        labels_rules = RuleIndex.of(labels_rules)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        reposlugs = [reposlug for reposlug, enabled in self.repos.items() if enabled and reposlug not in skip]
+        to_fetch = [
+            reposlug for reposlug in reposlugs
+            if not (incremental and self.store and self.store.is_fresh(self.name, reposlug))
+        ]
+        try:
+            prefetched = await self.prefetch_labels(to_fetch)
+        except Exception:
+            # Repositories are fetched one by one instead
+            prefetched = {}
+
+        async def _check(reposlug):
+            labels = prefetched.get(reposlug)
+            if isinstance(labels, Exception):
+                return reposlug, labels
+            async with semaphore:
+                try:
+                    return reposlug, await self.check_repo(reposlug, labels_rules, incremental, labels)
+                except Exception as e:
+                    return reposlug, e
+
+        tasks = [_check(reposlug) for reposlug in reposlugs]
+
+        # Update results for this service as repositories are checked
+        results = {}
+        for task in asyncio.as_completed(tasks):
+            reposlug, violations = await task
+            results[reposlug] = violations
+            if on_progress:
+                on_progress(self, reposlug, violations)
+        return (self, results)
+
+    # Actions of webhook events caused by operations
+    OPERATION_ACTIONS = {'update': 'edited', 'rename': 'edited', 'delete': 'deleted', 'create': 'created'}
+
+    async def apply_operation(self, reposlug, operation):
+        """ Executes single operation of reconciliation plan on repository. """
+        self._use_session()
+        label = operation.label.replace(old_name=operation.old_name)
+        with span('operation', service=self.name, repository=reposlug, type=operation.type, label=label.name):
+            if operation.type in ('update', 'rename'):
+                await self.connector.update_label(reposlug, label)
+            elif operation.type == 'delete':
+                await self.connector.remove_label(reposlug, label)
+            elif operation.type == 'create':
+                await self.connector.create_label(reposlug, label)
+
+        # Events about this write are echoes, not changes to fix
+        if self.queue:
+            self.queue.writes.remember(self.name, reposlug, label, self.OPERATION_ACTIONS[operation.type])
+
+        # Keep the stored state of repository in line with the fix
+        if self.store:
+            if operation.type == 'delete':
+                self.store.remove_label(self.name, reposlug, label)
+            else:
+                self.store.update_label(self.name, reposlug, label, operation.old_name)
         return True
 
-    async def fix_all(self, labels_rules, checked_repos):
+    async def fix_violation(self, labels_rules, reposlug, violation):
+        """ Fixes single violation. """
+        with span('fix_violation', service=self.name, repository=reposlug, type=violation.type):
+            return await self.fix_repo(labels_rules, reposlug, [violation])
+
+    async def fix_repo(self, labels_rules, reposlug, violations, run=None):
+        """ Fixes violations of single repository with minimal set of operations. \
+            Applied operations are recorded in the journal of the run, if there is one. """
+        solved = []
+        with span('fix_repo', service=self.name, repository=reposlug, violations=len(violations)) as span_:
+            operations = build_plan(labels_rules, violations)
+            span_.set_attribute('operations', len(operations))
+            for operation in operations:
+                solved.append(await self.apply_operation(reposlug, operation))
+                if run:
+                    run.operation_done(self, reposlug, operation)
+        return solved
+
+    @timed('fix_all')
+    @traced('fix_all')
+    async def fix_all(self, labels_rules, checked_repos, on_progress=None, run=None):
+        """ Fixes checked repositories concurrently, at most `concurrency` at a time. \
+            on_progress(service, reposlug, result) is called once a repository is done.
+            Progress is checkpointed to the journal of the run, if there is one. """
+        labels_rules = RuleIndex.of(labels_rules)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def _fix(reposlug, violations):
+            async with semaphore:
+                try:
+                    return reposlug, await self.fix_repo(labels_rules, reposlug, violations, run)
+                except Exception as e:
+                    return reposlug, e
+
         results = {}
+        tasks = []
         for reposlug, violations in checked_repos.items():
-            solved = []
-            results[reposlug]= solved
-            for violation in violations:
-                solved.append(await self.fix_violation(labels_rules, reposlug, violation))
-            
+            if isinstance(violations, Exception):
+                # Repository could not be checked, nothing to fix
+                results[reposlug] = violations
+                if run:
+                    run.repo_done(self, reposlug, violations)
+                continue
+            tasks.append(_fix(reposlug, violations))
+
+        for task in asyncio.as_completed(tasks):
+            reposlug, solved = await task
+            results[reposlug] = solved
+            if run:
+                run.repo_done(self, reposlug, solved)
+            if on_progress:
+                on_progress(self, reposlug, solved)
         return (self, results)
 
-        
+    @timed('plan_all')
+    @traced('plan_all')
+    async def plan_all(self, labels_rules, incremental=False, on_record=None):
+        """ Checks all repositories and returns their reconciliation plans without fixing anything. \
+            Plans are JSON serializable records, repositories which need no changes are left out.
+            on_record(record) is called for every record as soon as its repository is checked. """
+        labels_rules = RuleIndex.of(labels_rules)
+        records = []
+        await self.check_all(labels_rules, incremental, self._planner(labels_rules, records, on_record))
+        return (self, records)
+
+    def _planner(self, labels_rules, records, on_record=None):
+        """ Returns on_progress callback of check_all which plans every checked repository. """
+        def _on_progress(service, reposlug, violations):
+            for record in self._plan_records(labels_rules, {reposlug: violations}):
+                records.append(record)
+                if on_record:
+                    on_record(record)
+        return _on_progress
+
+    def _plan_records(self, labels_rules, checked_repos):
+        records = []
+        for reposlug, violations in checked_repos.items():
+            if isinstance(violations, Exception):
+                records.append({'service': self.name, 'repository': reposlug, 'error': str(violations)})
+                continue
+            operations = build_plan(labels_rules, violations)
+            if operations:
+                records.append(plan_record(self.name, operations, repository=reposlug))
+        return records
+
+    def manages(self, record):
+        """ Tells if target of the plan record is an enabled repository of the service. """
+        reposlug = record.get('repository')
+        return isinstance(reposlug, str) and 'group' not in record and bool(self.repos.get(reposlug))
+
+    @timed('execute_plan')
+    @traced('execute_plan')
+    async def execute_plan(self, records, on_progress=None):
+        """ Executes plan records made by plan_all earlier, without checking repositories again. \
+            Repositories are processed concurrently, at most `concurrency` at a time. """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def _execute(record):
+            reposlug = record['repository']
+            async with semaphore:
+                try:
+                    solved = []
+                    for operation in record['operations']:
+                        solved.append(await self.apply_operation(reposlug, Operation.from_dict(operation)))
+                    return reposlug, solved
+                except Exception as e:
+                    return reposlug, e
+
+        tasks = [_execute(record) for record in records if 'repository' in record and 'operations' in record]
+        results = {}
+        for task in asyncio.as_completed(tasks):
+            reposlug, solved = await task
+            results[reposlug] = solved
+            if on_progress:
+                on_progress(self, reposlug, solved)
+        return (self, results)
 
 class GitHubService(Service):
-    def __init__(self, name, token, secret, repos, connector=None):
-        super().__init__(name, token, secret, repos)
+
+    # Labels of at least this many repositories are fetched with GraphQL API
+    DEFAULT_GRAPHQL_THRESHOLD = 10
+
+    def __init__(self, name, token, secret, repos, connector=None, concurrency=None, pool=None, graphql_threshold=None):
+        super().__init__(name, token, secret, repos, concurrency, pool)
+        self.graphql_threshold = graphql_threshold or self.DEFAULT_GRAPHQL_THRESHOLD
         if not connector:
             self.connector = GitHubConnector(token)
         else:
@@ -143,6 +346,12 @@ class GitHubService(Service):
             'Authorization': f'token {self.token}'
         }
 
+    async def prefetch_labels(self, reposlugs):
+        """ Retrieves labels of many repositories with few GraphQL queries. """
+        if len(reposlugs) < self.graphql_threshold or not hasattr(self.connector, 'get_labels_bulk'):
+            return {}
+        return await self.connector.get_labels_bulk(reposlugs)
+
     def check_secret(self, request):
         """ Checks secret for webhook. """
         signature = request.headers["X-Hub-Signature"]
@@ -155,61 +364,53 @@ class GitHubService(Service):
 
         return hmac.compare_digest(signature, "sha1=" + digest)
 
+    def parse_event(self, request):
+        """ Validates webhook request and returns event with labels to fix. """
+        payload = request.json
+        repository = payload['repository']['full_name']
+        if not self.repos.get(repository):
+            abort(400, 'Repository is not supported')
+        label = payload['label']
+        return {
+            'repository': repository,
+            'action': payload['action'],
+            'labels': [{'name': label['name'], 'color': label['color'], 'description': label['description']}]
+        }
+
     def webhook(self, request, labels_rules):
         """ Processes webhook request. """
-        async def _fix_labels():
-            repository = request.json['repository']['full_name']
-            if self.repos.get(repository):
-                action = request.json['action']
-                # if action == 'created' or action == 'edited':
-                label = request.json['label']
-                return await self.fix_labels(
-                    repository, 
-                    labels_rules, 
-                    [Label(label['name'], label['color'], label['description'])],
-                    action
-                )
-            else:
-                abort(400, 'Repository is not supported')
-
         if self.check_secret(request):
             event_type = request.headers['X-Github-Event']
             if event_type == 'ping':
                 return 'OK', 200
             else:
-                asyncio.set_event_loop(asyncio.SelectorEventLoop())
-                loop = asyncio.get_event_loop()
-                results = loop.run_until_complete(_fix_labels())
-                loop.close()
-                if results:
-                    response = Response(
-                        response='OK',
-                        status=200,
-                    )
-                    return response
-                else:
-                    response = Response(
-                        response='Something wrong',
-                        status=500
-                    )
-                    return response
+                return self.process_event(self.parse_event(request), labels_rules)
         else:
             abort(400, "Invalid secret")            
 
     @classmethod
     def load(cls, cfg, name, token, secret, repos):
+        concurrency = cfg.getint('service:github', 'concurrency', fallback=None)
+        limiter = RateLimiter.load(cfg, 'service:github')
+        retry = RetryPolicy.load(cfg, 'service:github')
+        graphql_threshold = cfg.getint('service:github', 'graphql_threshold', fallback=None)
         return GitHubService(
             name,
             token,
             secret,
-            repos
+            repos,
+            connector=GitHubConnector(token, limiter=limiter, retry=retry),
+            concurrency=concurrency,
+            graphql_threshold=graphql_threshold
         )
 
 
 
 class GitLabService(Service):
-    def __init__(self, name, token, secret, repos, host=None, connector=None):
-        super().__init__(name, token, secret, repos)
+    def __init__(self, name, token, secret, repos, host=None, connector=None, concurrency=None, pool=None, groups=None):
+        super().__init__(name, token, secret, repos, concurrency, pool)
+        # Groups whose labels are managed instead of labels of their projects
+        self.groups = groups or []
         
         if not host:
             self.host = 'gitlab.com'
@@ -228,54 +429,177 @@ class GitLabService(Service):
             'PRIVATE-TOKEN': f'{self.token}'
         }
 
+    def group_of(self, reposlug):
+        """ Returns the closest managed group containing the project, if there is one. """
+        candidates = [group for group in self.groups if reposlug.startswith(group + '/')]
+        return max(candidates, key=len, default=None)
+
+    async def check_group(self, labels_rules, group):
+        """ Checks labels defined by the group against the rules. """
+        self._use_session()
+        with span('check_group', service=self.name, group=group):
+            labels = await self.connector.get_group_labels(group)
+            return RuleIndex.of(labels_rules).evaluate(labels)
+
+    async def apply_group_operation(self, group, operation):
+        """ Executes operation on the group level, once for all its projects. """
+        self._use_session()
+        label = operation.label.replace(old_name=operation.old_name)
+        with span('group_operation', service=self.name, group=group, type=operation.type, label=label.name):
+            if operation.type in ('update', 'rename'):
+                await self.connector.update_group_label(group, label)
+            elif operation.type == 'delete':
+                await self.connector.remove_group_label(group, label)
+            elif operation.type == 'create':
+                await self.connector.create_group_label(group, label)
+
+        # Labels of all projects of the group have changed
+        action = self.OPERATION_ACTIONS[operation.type]
+        for reposlug in self.repos:
+            if self.group_of(reposlug) == group:
+                if self.queue:
+                    self.queue.writes.remember(self.name, reposlug, label, action)
+                if self.store:
+                    self.store.mark_dirty(self.name, reposlug)
+        return True
+
+    def manages(self, record):
+        """ Tells if target of the plan record is an enabled project or a managed group with one. """
+        group = record.get('group')
+        if group is None:
+            return super().manages(record)
+        return (
+            isinstance(group, str) and 'repository' not in record and group in self.groups
+            and any(enabled and self.group_of(reposlug) == group for reposlug, enabled in self.repos.items())
+        )
+
+    async def apply_operation(self, reposlug, operation):
+        """ Executes operations on inherited and missing labels of projects in managed groups on the group. """
+        group = self.group_of(reposlug)
+        if group and (operation.label.inherited or operation.type == 'create'):
+            return await self.apply_group_operation(group, operation)
+        return await super().apply_operation(reposlug, operation)
+
+    def _project_violations(self, checked_repos):
+        """ Leaves out violations of projects in managed groups which are fixed on the group. """
+        project_repos = {}
+        for reposlug, violations in checked_repos.items():
+            if self.group_of(reposlug) and not isinstance(violations, Exception):
+                violations = [
+                    violation for violation in violations
+                    if not violation.label.inherited and violation.type != 'missing'
+                ]
+            project_repos[reposlug] = violations
+        return project_repos
+
+    @timed('fix_all')
+    @traced('fix_all')
+    async def fix_all(self, labels_rules, checked_repos, on_progress=None, run=None):
+        """ Fixes managed groups first, then the projects. \
+            Violations the group fix has already solved are not fixed per project. """
+        labels_rules = RuleIndex.of(labels_rules)
+        groups = {self.group_of(reposlug) for reposlug in checked_repos} - {None}
+        results = {}
+        for group in sorted(groups):
+            # Failed group leaves its labels unfixed, the projects are fixed anyway
+            try:
+                solved = []
+                for operation in build_plan(labels_rules, await self.check_group(labels_rules, group)):
+                    solved.append(await self.apply_group_operation(group, operation))
+                    if run:
+                        run.operation_done(self, group, operation)
+                results[group] = solved
+            except Exception as e:
+                results[group] = e
+
+        _, project_results = await super().fix_all(labels_rules, self._project_violations(checked_repos), on_progress, run)
+        results.update(project_results)
+        return (self, results)
+
+    @timed('plan_all')
+    @traced('plan_all')
+    async def plan_all(self, labels_rules, incremental=False, on_record=None):
+        """ Returns plans of managed groups followed by plans of the projects. """
+        labels_rules = RuleIndex.of(labels_rules)
+        records = []
+        groups = {self.group_of(reposlug) for reposlug, enabled in self.repos.items() if enabled} - {None}
+        for group in sorted(groups):
+            try:
+                operations = build_plan(labels_rules, await self.check_group(labels_rules, group))
+            except Exception as e:
+                record = {'service': self.name, 'group': group, 'error': str(e)}
+            else:
+                if not operations:
+                    continue
+                record = plan_record(self.name, operations, group=group)
+            records.append(record)
+            if on_record:
+                on_record(record)
+
+        plan_project = self._planner(labels_rules, records, on_record)
+        def _on_progress(service, reposlug, violations):
+            plan_project(service, reposlug, self._project_violations({reposlug: violations})[reposlug])
+        await self.check_all(labels_rules, incremental, _on_progress)
+        return (self, records)
+
+    @timed('execute_plan')
+    @traced('execute_plan')
+    async def execute_plan(self, records, on_progress=None):
+        """ Executes plans of groups first, then plans of the projects. """
+        results = {}
+        for record in records:
+            if 'group' not in record or 'operations' not in record:
+                continue
+            try:
+                results[record['group']] = [
+                    await self.apply_group_operation(record['group'], Operation.from_dict(operation))
+                    for operation in record['operations']
+                ]
+            except Exception as e:
+                results[record['group']] = e
+        _, project_results = await super().execute_plan(records, on_progress)
+        results.update(project_results)
+        return (self, results)
+
     def check_secret(self, request):
         """ Checks secret for webhook. """
         secret = request.headers["X-Gitlab-Token"]
         return secret == self.secret
 
-    def webhook(self, request, labels_rules):
-        """ Processes webhook request. """
-        async def _fix_labels():
-            repository = request.json['project']['path_with_namespace']
-            if self.repos.get(repository):
-                event_type = request.headers['X-Gitlab-Event'].lower()
-                if event_type == 'issue hook' or event_type == 'merge request hook':
-                    labels = request.json['labels'] 
-                else:
-                    if request.json['object_attributes']['noteable_type'].lower() == 'issue':
-                        labels = request.json['issue']['labels']
-                    else:
-                        abort(400, 'Bad notable type')
-                
-                labels_ = [Label(label['title'], label['color'], label['description']) for label in labels]
-                
-                return await self.fix_labels(
-                    repository, 
-                    labels_rules, 
-                    labels_
-                )
+    def parse_event(self, request):
+        """ Validates webhook request and returns event with labels to fix. """
+        payload = request.json
+        event_type = request.headers['X-Gitlab-Event'].lower()
+        repository = payload['project']['path_with_namespace']
+        if not self.repos.get(repository):
+            abort(400, 'Repository is not supported')
+        if event_type == 'issue hook' or event_type == 'merge request hook':
+            labels = payload['labels'] 
+        else:
+            if payload['object_attributes']['noteable_type'].lower() == 'issue':
+                labels = payload['issue']['labels']
             else:
-                abort(400, 'Repository is not supported')
+                abort(400, 'Bad notable type')
+        return {
+            'repository': repository,
+            'action': None,
+            'labels': [
+                {
+                    'name': label['title'],
+                    'color': label['color'],
+                    'description': label['description'],
+                    'inherited': label.get('type') == 'GroupLabel'
+                }
+                for label in labels
+            ]
+        }
 
+    def webhook(self, request, labels_rules):
+        """ Processes webhook request. """
         if self.check_secret(request):
             event_type = request.headers['X-Gitlab-Event'].lower()
             if event_type in self._supported_events:
-                asyncio.set_event_loop(asyncio.SelectorEventLoop())
-                loop = asyncio.get_event_loop()
-                results = loop.run_until_complete(_fix_labels())
-                loop.close()
-                if results:
-                    response = Response(
-                        response='OK',
-                        status=200,
-                    )
-                    return response
-                else:
-                    response = Response(
-                        response='Something wrong',
-                        status=500
-                    )
-                return response
+                return self.process_event(self.parse_event(request), labels_rules)
             else:
                 abort(400, "Invalid event")
         else:
@@ -284,10 +608,17 @@ class GitLabService(Service):
     @classmethod
     def load(cls, cfg, name, token, secret, repos):
         host = cfg.get('service:gitlab', 'host')
+        concurrency = cfg.getint('service:gitlab', 'concurrency', fallback=None)
+        limiter = RateLimiter.load(cfg, 'service:gitlab')
+        retry = RetryPolicy.load(cfg, 'service:gitlab')
+        groups = [group.strip() for group in cfg.get('service:gitlab', 'groups', fallback='').split(',') if group.strip()]
         return GitLabService(
             name,
             token,
             secret,
             repos,
-            host
+            host,
+            connector=GitLabConnector(host, token, limiter=limiter, retry=retry),
+            concurrency=concurrency,
+            groups=groups
         )
\ No newline at end of file
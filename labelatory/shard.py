@@ -0,0 +1,128 @@
+import asyncio
+import configparser
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+
+from . import tracing
+from .pool import ConnectionPool
+from .store import LabelStore
+
+
+# Services of the worker process, loaded once by _init_worker
+_services = {}
+_loop = None
+
+
+def _init_worker(path):
+    """ Loads services of the configuration in a fresh worker process. \
+        Every worker has its own event loop and pool of connections. """
+    global _loop
+    from .labelatory import ConfigLoader
+
+    cfg = configparser.ConfigParser()
+    with open(path) as f:
+        cfg.read_file(f)
+
+    tracing.configure(cfg)
+    pool = ConnectionPool.load(cfg)
+    store = LabelStore.load(cfg)
+    for section in cfg.sections():
+        if not section.startswith('service:'):
+            continue
+        name = section[8:]
+        service = ConfigLoader.SUPPORTED_SERVICES[name].load(
+            cfg, name, cfg.get(section, 'token'), cfg.get(section, 'secret'), {}
+        )
+        service.pool = pool
+        service.store = store
+        _services[name] = service
+    _loop = asyncio.new_event_loop()
+
+
+def _check_shard(service_name, reposlugs, labels_rules, incremental):
+    """ Checks one shard of repositories in the worker process. """
+    service = _services[service_name]
+    service.repos = dict.fromkeys(reposlugs, True)
+    _, results = _loop.run_until_complete(service.check_all(labels_rules, incremental))
+    # Exceptions of libraries are not always picklable
+    return {
+        reposlug: Exception(str(result)) if isinstance(result, Exception) else result
+        for reposlug, result in results.items()
+    }
+
+
+class ShardPool():
+    """ Pool of processes checking shards of repositories of very large services. \
+        Each process loads the services from the configuration file and runs its own
+        event loop, so decoding of responses and building of labels scales across cores. """
+
+    def __init__(self, path, processes=0, min_repos=1000, shards_per_process=4):
+        self.path = path
+        self.processes = processes
+        self.min_repos = min_repos
+        self.shards_per_process = shards_per_process
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            # Forking would copy threads of the web application into the workers
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(self.path,)
+            )
+        return self._executor
+
+    def handles(self, service):
+        """ Tells whether the service has enough enabled repositories to be sharded. """
+        enabled = sum(1 for enabled in service.repos.values() if enabled)
+        return self.processes > 1 and enabled >= self.min_repos
+
+    def _shards(self, reposlugs):
+        """ Splits repositories into shards, several per process to balance the load. """
+        count = min(len(reposlugs), self.processes * self.shards_per_process) or 1
+        return [reposlugs[index::count] for index in range(count)]
+
+    async def check_all(self, service, labels_rules, incremental=False, on_progress=None, skip=()):
+        """ Checks enabled repositories of the service in worker processes. \
+            Returns results in the same form as Service.check_all. """
+        executor = self._get_executor()
+        rules = dict(labels_rules.items())
+        reposlugs = [reposlug for reposlug, enabled in service.repos.items() if enabled and reposlug not in skip]
+
+        async def _check(shard):
+            future = executor.submit(_check_shard, service.name, shard, rules, incremental)
+            try:
+                return shard, await asyncio.wrap_future(future)
+            except Exception as e:
+                # Failed worker fails all repositories of its shard
+                return shard, {reposlug: e for reposlug in shard}
+
+        results = {}
+        for task in asyncio.as_completed([_check(shard) for shard in self._shards(reposlugs)]):
+            shard, shard_results = await task
+            results.update(shard_results)
+            if on_progress:
+                for reposlug in shard:
+                    on_progress(service, reposlug, shard_results[reposlug])
+        return (service, results)
+
+    def close(self):
+        if self._executor:
+            self._executor.shutdown()
+            self._executor = None
+
+    @classmethod
+    def load(cls, cfg, path):
+        """ Loads pool from 'shards' section of configuration, if there is one. """
+        processes = cfg.getint('shards', 'processes', fallback=0)
+        if processes < 2:
+            return None
+        return ShardPool(
+            path,
+            processes=processes,
+            min_repos=cfg.getint('shards', 'min_repos', fallback=1000),
+            shards_per_process=cfg.getint('shards', 'shards_per_process', fallback=4)
+        )
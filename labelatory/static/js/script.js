@@ -229,6 +229,52 @@ function saveConfig(){
 }
 
 function checkLabels(){
+    if (!window.EventSource){
+        checkLabelsAtOnce()
+        return
+    }
+
+    // Results of repositories are shown as soon as they are checked
+    var progress = document.getElementById('check-progress')
+    var source = new EventSource('/check/labels/stream')
+    source.addEventListener('start', function(e){
+        var data = JSON.parse(e.data)
+        if (progress){
+            progress.innerHTML = "0 / " + data.total
+        }
+    })
+    source.addEventListener('repo', function(e){
+        var data = JSON.parse(e.data)
+        var cell = document.getElementById(data.service+"."+data.repository)
+        if (cell){
+            if (data.status == 'error'){
+                cell.innerHTML = "error: " + data.error
+            } else {
+                cell.innerHTML = data.status
+            }
+        }
+        if (progress){
+            progress.innerHTML = data.checked + " / " + data.total + " (bad: " + data.bad + ", errors: " + data.errors + ")"
+        }
+    })
+    source.addEventListener('failed', function(e){
+        console.log(JSON.parse(e.data))
+    })
+    source.onerror = function(){
+        // Don't let the browser start the check again after lost connection
+        source.close()
+    }
+    source.addEventListener('done', function(e){
+        var data = JSON.parse(e.data)
+        source.close()
+        if (progress){
+            progress.innerHTML = "Checked " + data.checked + " of " + data.total + " (bad: " + data.bad + ", errors: " + data.errors + ")"
+        }
+    })
+}
+
+
+function checkLabelsAtOnce(){
     var xhr = new XMLHttpRequest()
 
     xhr.open('GET', '/check/labels', true)
@@ -240,9 +286,25 @@ function checkLabels(){
                 var resp = JSON.parse(xhr.response)
                 console.log(resp)
 
+                var errors = resp.errors || {}
+                delete resp.errors
+
                 for (var key of Object.keys(resp)){
                     console.log(key + "->" + resp[key])
-                    document.getElementById(key+"."+resp[key]).innerHTML = "bad"
+                    for (var repo of resp[key]){
+                        var cell = document.getElementById(key+"."+repo)
+                        if (cell){
+                            cell.innerHTML = "bad"
+                        }
+                    }
+                }
+                for (var key of Object.keys(errors)){
+                    for (var repo of Object.keys(errors[key])){
+                        var cell = document.getElementById(key+"."+repo)
+                        if (cell){
+                            cell.innerHTML = "error: " + errors[key][repo]
+                        }
+                    }
                 }
                 return
             }
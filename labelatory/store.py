@@ -0,0 +1,119 @@
+import time
+
+from .label import Label
+from .database import Database
+
+
+class LabelStore(Database):
+    """ Local SQLite database of the last known labels of repositories. \
+        Scans and fixes keep it up to date, webhooks mark repositories as dirty.
+        Incremental checks fetch only repositories which are dirty or stale. """
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS repos (
+            service TEXT NOT NULL,
+            reposlug TEXT NOT NULL,
+            checked_at REAL,
+            dirty INTEGER NOT NULL DEFAULT 0,
+            fingerprint TEXT,
+            PRIMARY KEY (service, reposlug)
+        );
+        CREATE TABLE IF NOT EXISTS labels (
+            service TEXT NOT NULL,
+            reposlug TEXT NOT NULL,
+            name TEXT NOT NULL,
+            color TEXT,
+            description TEXT,
+            inherited INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (service, reposlug, name)
+        );
+    '''
+
+    def __init__(self, path, max_age=3600):
+        super().__init__(path)
+        self.max_age = max_age
+
+        # Stores created before fingerprints were kept lack the column
+        if 'fingerprint' not in self._columns('repos'):
+            self._db.execute('ALTER TABLE repos ADD COLUMN fingerprint TEXT')
+        # Labels stored before inherited GitLab labels were told apart are fetched again
+        if 'inherited' not in self._columns('labels'):
+            self._db.execute('ALTER TABLE labels ADD COLUMN inherited INTEGER NOT NULL DEFAULT 0')
+            self._db.execute('UPDATE repos SET dirty = 1')
+
+    def save_labels(self, service, reposlug, labels, fingerprint=None):
+        """ Replaces stored labels of repository with freshly fetched ones. """
+        statements = [
+            ('DELETE FROM labels WHERE service = ? AND reposlug = ?', (service, reposlug)),
+            ('INSERT OR REPLACE INTO repos (service, reposlug, checked_at, dirty, fingerprint) VALUES (?, ?, ?, 0, ?)',
+                (service, reposlug, time.time(), fingerprint)),
+        ]
+        statements.extend(
+            ('INSERT OR REPLACE INTO labels VALUES (?, ?, ?, ?, ?, ?)',
+                (service, reposlug, label.name, label.color, label.description, label.inherited))
+            for label in labels
+        )
+        self._execute(*statements)
+
+    def load_labels(self, service, reposlug):
+        """ Returns stored labels of repository. """
+        rows = self._query(
+            'SELECT name, color, description, inherited FROM labels WHERE service = ? AND reposlug = ?',
+            (service, reposlug)
+        )
+        return [Label(name, color, description, bool(inherited)) for name, color, description, inherited in rows]
+
+    def get_fingerprint(self, service, reposlug):
+        """ Returns fingerprint of stored labels of repository, if it is known. """
+        rows = self._query(
+            'SELECT fingerprint FROM repos WHERE service = ? AND reposlug = ?',
+            (service, reposlug)
+        )
+        return rows[0][0] if rows else None
+
+    def is_fresh(self, service, reposlug):
+        """ Tells whether stored labels of repository can be used instead of fetching them. """
+        rows = self._query(
+            'SELECT checked_at, dirty FROM repos WHERE service = ? AND reposlug = ?',
+            (service, reposlug)
+        )
+        if not rows:
+            return False
+        checked_at, dirty = rows[0]
+        return not dirty and checked_at is not None and time.time() - checked_at < self.max_age
+
+    def mark_dirty(self, service, reposlug):
+        """ Marks repository to be fetched by the next incremental check. """
+        self._execute((
+            'INSERT INTO repos (service, reposlug, dirty) VALUES (?, ?, 1) '
+            'ON CONFLICT (service, reposlug) DO UPDATE SET dirty = 1',
+            (service, reposlug)
+        ))
+
+    def update_label(self, service, reposlug, label, old_name=None):
+        """ Stores label created or updated in repository. """
+        self._execute(
+            ('UPDATE repos SET fingerprint = NULL WHERE service = ? AND reposlug = ?',
+                (service, reposlug)),
+            ('DELETE FROM labels WHERE service = ? AND reposlug = ? AND name = ?',
+                (service, reposlug, old_name or label.name)),
+            ('INSERT OR REPLACE INTO labels VALUES (?, ?, ?, ?, ?, ?)',
+                (service, reposlug, label.name, label.color, label.description, label.inherited))
+        )
+
+    def remove_label(self, service, reposlug, label):
+        """ Forgets label removed from repository. """
+        self._execute(
+            ('UPDATE repos SET fingerprint = NULL WHERE service = ? AND reposlug = ?',
+                (service, reposlug)),
+            ('DELETE FROM labels WHERE service = ? AND reposlug = ? AND name = ?',
+                (service, reposlug, label.name))
+        )
+
+    @classmethod
+    def load(cls, cfg):
+        """ Loads store from 'store' section of configuration, if there is one. """
+        path = cfg.get('store', 'path', fallback=None)
+        if not path:
+            return None
+        return LabelStore(path, max_age=cfg.getint('store', 'max_age', fallback=3600))
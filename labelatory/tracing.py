@@ -0,0 +1,278 @@
+import os
+import json
+import time
+import zlib
+import queue
+import random
+import logging
+import functools
+import threading
+import contextvars
+
+import requests
+
+from contextlib import contextmanager
+
+
+logger = logging.getLogger(__name__)
+
+
+# Span of the current task, parent of the spans it opens
+_current = contextvars.ContextVar('labelatory_span', default=None)
+
+
+class Span():
+    """ Timed operation with attributes, part of a trace. """
+
+    def __init__(self, name, trace_id, parent_id=None, attributes=None, lane=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        # Spans of one repository are drawn in one row of flame charts
+        self.lane = self.attributes.get('repository') or self.attributes.get('group') or lane or trace_id
+        self.start = time.time_ns()
+        self.end = None
+        self.error = None
+
+    def set_attribute(self, name, value):
+        self.attributes[name] = value
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': self.start,
+            'end': self.end,
+            'duration_ms': (self.end - self.start) / 1e6,
+            'attributes': self.attributes,
+            'error': self.error
+        }
+
+
+class _NoopSpan():
+    """ Span of disabled or not sampled trace. """
+
+    def set_attribute(self, name, value):
+        pass
+
+
+NOOP = _NoopSpan()
+
+
+class Tracer():
+    """ Opens spans and passes the finished ones to the exporter. \
+        Without exporter tracing is disabled and spans cost almost nothing.
+        Only `sample` fraction of traces is recorded, decided by their root span. """
+
+    def __init__(self, exporter=None, sample=1.0):
+        self.exporter = exporter
+        self.sample = sample
+
+    @contextmanager
+    def span(self, name, **attributes):
+        parent = _current.get()
+        if self.exporter is None or parent is NOOP:
+            yield NOOP
+            return
+        if parent is None:
+            if random.random() >= self.sample:
+                # Children of not sampled root are not recorded either
+                token = _current.set(NOOP)
+                try:
+                    yield NOOP
+                finally:
+                    _current.reset(token)
+                return
+            span = Span(name, os.urandom(16).hex(), None, attributes)
+        else:
+            span = Span(name, parent.trace_id, parent.span_id, attributes, parent.lane)
+
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f'{type(e).__name__}: {e}'
+            raise
+        finally:
+            _current.reset(token)
+            span.end = time.time_ns()
+            self.exporter.export(span)
+
+    def close(self):
+        if self.exporter:
+            self.exporter.close()
+
+
+class BatchExporter():
+    """ Collects finished spans and sends them in batches from a background thread. """
+
+    def __init__(self, interval=1.0, batch_size=512):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._spans = queue.Queue()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='labelatory-tracing', daemon=True)
+        self._thread.start()
+
+    def export(self, span):
+        self._spans.put(span)
+
+    def _drain(self):
+        spans = []
+        while len(spans) < self.batch_size:
+            try:
+                spans.append(self._spans.get_nowait())
+            except queue.Empty:
+                break
+        return spans
+
+    def _run(self):
+        while not self._closed.wait(self.interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        spans = self._drain()
+        while spans:
+            try:
+                self._send(spans)
+            except Exception as e:
+                logger.error(f'Exporting {len(spans)} spans failed: {e}')
+            spans = self._drain()
+
+    def _send(self, spans):
+        raise NotImplementedError('Too generic. Use a subclass for sending spans.')
+
+    def close(self):
+        self._closed.set()
+        self._thread.join(5)
+
+
+class JsonLinesExporter(BatchExporter):
+    """ Appends spans to a file as JSON lines. """
+
+    def __init__(self, path, **kwargs):
+        self.path = path
+        super().__init__(**kwargs)
+
+    def _send(self, spans):
+        with open(self.path, 'a') as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict()) + '\n')
+
+
+class ChromeTraceExporter(BatchExporter):
+    """ Writes spans in Chrome trace event format, \
+        which chrome://tracing, Perfetto or speedscope show as a flame chart.
+        The format allows the closing bracket to be missing, so spans are just appended. """
+
+    def __init__(self, path, **kwargs):
+        self.path = path
+        # Worker processes append to the file started by the application
+        with open(path, 'a') as f:
+            if f.tell() == 0:
+                f.write('[\n')
+        super().__init__(**kwargs)
+
+    def _send(self, spans):
+        with open(self.path, 'a') as f:
+            for span in spans:
+                f.write(json.dumps({
+                    'name': span.name,
+                    'cat': span.name.split('.')[0],
+                    'ph': 'X',
+                    'ts': span.start / 1000,
+                    'dur': (span.end - span.start) / 1000,
+                    # Concurrent repositories get their own rows, so they don't overlap
+                    'pid': int(span.trace_id[:4], 16),
+                    'tid': zlib.crc32(span.lane.encode()),
+                    'args': dict(span.attributes, error=span.error) if span.error else span.attributes
+                }) + ',\n')
+
+
+class OtlpExporter(BatchExporter):
+    """ Sends spans to an OpenTelemetry collector over OTLP/HTTP with JSON encoding. """
+
+    def __init__(self, endpoint, service_name='labelatory', **kwargs):
+        self.url = endpoint.rstrip('/') + '/v1/traces'
+        self.service_name = service_name
+        super().__init__(**kwargs)
+
+    @staticmethod
+    def _value(value):
+        if isinstance(value, bool):
+            return {'boolValue': value}
+        if isinstance(value, int):
+            return {'intValue': str(value)}
+        if isinstance(value, float):
+            return {'doubleValue': value}
+        return {'stringValue': str(value)}
+
+    def _span(self, span):
+        data = {
+            'traceId': span.trace_id,
+            'spanId': span.span_id,
+            'name': span.name,
+            'kind': 1,
+            'startTimeUnixNano': str(span.start),
+            'endTimeUnixNano': str(span.end),
+            'attributes': [{'key': key, 'value': self._value(value)} for key, value in span.attributes.items()],
+            'status': {'code': 2, 'message': span.error} if span.error else {'code': 1}
+        }
+        if span.parent_id:
+            data['parentSpanId'] = span.parent_id
+        return data
+
+    def _send(self, spans):
+        payload = {'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': self.service_name}}]},
+            'scopeSpans': [{'scope': {'name': 'labelatory'}, 'spans': [self._span(span) for span in spans]}]
+        }]}
+        resp = requests.post(self.url, json=payload, timeout=10)
+        resp.raise_for_status()
+
+
+tracer = Tracer()
+
+
+def span(name, **attributes):
+    """ Opens span of the global tracer. """
+    return tracer.span(name, **attributes)
+
+
+async def in_span(name, coro, **attributes):
+    """ Awaits coroutine within a span, so spans it opens become its children. """
+    with tracer.span(name, **attributes):
+        return await coro
+
+
+def traced(name):
+    """ Decorates coroutine method of a service to run in a span with the service name. """
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            with tracer.span(name, service=self.name):
+                return await method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def configure(cfg):
+    """ Sets up the global tracer from 'tracing' section of configuration. """
+    global tracer
+    exporter = cfg.get('tracing', 'exporter', fallback=None)
+    if exporter == 'json':
+        exporter = JsonLinesExporter(cfg.get('tracing', 'path', fallback='traces.jsonl'))
+    elif exporter == 'chrome':
+        exporter = ChromeTraceExporter(cfg.get('tracing', 'path', fallback='traces.json'))
+    elif exporter == 'otlp':
+        exporter = OtlpExporter(cfg.get('tracing', 'endpoint', fallback='http://localhost:4318'))
+    elif exporter:
+        raise Exception('Tracing exporter can be only \'json\', \'chrome\' or \'otlp\'!')
+    tracer.close()
+    tracer = Tracer(exporter, cfg.getfloat('tracing', 'sample', fallback=1.0))
+    return tracer
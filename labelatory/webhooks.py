@@ -0,0 +1,188 @@
+import json
+import time
+import asyncio
+import logging
+import sqlite3
+import threading
+
+from .rules import normalize_color, normalize_description
+
+
+logger = logging.getLogger(__name__)
+
+
+class RecentWrites():
+    """ Labels recently written by Labelatory itself. \
+        Webhook events caused by these writes are echoes and need no fixing. """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._writes = {}
+
+    @staticmethod
+    def _key(service, reposlug, name, color, description, action):
+        if action == 'deleted':
+            return (service, reposlug, name, None, None)
+        return (service, reposlug, name, normalize_color(color), normalize_description(description))
+
+    def remember(self, service, reposlug, label, action):
+        """ Records label written to repository by Labelatory. """
+        key = self._key(service, reposlug, label.name, label.color, label.description, action)
+        self._writes[key] = time.monotonic() + self.ttl
+
+    def is_echo(self, service, reposlug, label, action):
+        """ Tells whether event about label only reflects our own write. """
+        now = time.monotonic()
+        if len(self._writes) > 10000:
+            self._writes = {key: expires for key, expires in self._writes.items() if expires > now}
+        key = self._key(service, reposlug, label['name'], label.get('color'), label.get('description'), action)
+        expires = self._writes.get(key)
+        return expires is not None and expires > now
+
+
+class WebhookQueue():
+    """ Queue of webhook events fixed by workers on the background loop. \
+        Web handler only validates and enqueues the event, so it can answer at once.
+        Events of one repository arriving within `window` seconds are merged into one fix,
+        echoes of our own writes are dropped.
+        With a path, pending events are kept in SQLite and replayed after restart. """
+
+    def __init__(self, workers=4, path=None, window=2.0, echo_ttl=60):
+        self.workers = workers
+        self.path = path
+        self.window = window
+        self.writes = RecentWrites(echo_ttl)
+        self.dropped = 0
+        self.merged = 0
+        self._collecting = {}
+        self.loop = None
+        self.services = {}
+        self.rules = None
+        self._queue = None
+        self._tasks = []
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS events ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, service TEXT NOT NULL, event TEXT NOT NULL)'
+            )
+
+    def start(self, loop, services, rules):
+        """ Starts workers on the background loop. \
+            rules() returns rules for labels at the time the event is processed. """
+        self.loop = loop
+        self.services = {service.name: service for service in services}
+        self.rules = rules
+        loop.run(self._start())
+
+    async def _start(self):
+        self._queue = asyncio.Queue()
+        for event_id, service_name, event in self._pending():
+            service = self.services.get(service_name)
+            if service:
+                self._collect(service, event_id, event)
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    def _pending(self):
+        """ Returns events which were not processed before restart. """
+        if not self._db:
+            return []
+        with self._lock:
+            rows = self._db.execute('SELECT id, service, event FROM events ORDER BY id').fetchall()
+        return [(event_id, service, json.loads(event)) for event_id, service, event in rows]
+
+    def put(self, service, event):
+        """ Enqueues event of the service. Can be called from any thread. """
+        event_id = None
+        if self._db:
+            with self._lock:
+                event_id = self._db.execute(
+                    'INSERT INTO events (service, event) VALUES (?, ?)',
+                    (service.name, json.dumps(event))
+                ).lastrowid
+        self.loop.loop.call_soon_threadsafe(self._collect, service, event_id, event)
+
+    def _forget(self, event_ids):
+        """ Removes processed events from durable queue. """
+        event_ids = [event_id for event_id in event_ids if event_id is not None]
+        if event_ids:
+            with self._lock:
+                self._db.executemany('DELETE FROM events WHERE id = ?', [(event_id,) for event_id in event_ids])
+
+    def _collect(self, service, event_id, event):
+        """ Merges event with other events of the repository waiting for the window to pass. """
+        repository = event['repository']
+        labels = [
+            label for label in event['labels']
+            if not self.writes.is_echo(service.name, repository, label, label.get('action', event.get('action')))
+        ]
+        if not labels:
+            self.dropped += 1
+            self._forget([event_id])
+            return
+
+        key = (service.name, repository)
+        pending = self._collecting.get(key)
+        if pending is None:
+            pending = {'service': service, 'event_ids': [], 'labels': {}}
+            self._collecting[key] = pending
+            self.loop.loop.call_later(self.window, self._flush, key)
+        else:
+            self.merged += 1
+        pending['event_ids'].append(event_id)
+        for label in labels:
+            # Later event of the same label overrides earlier ones
+            pending['labels'][label['name']] = {**label, 'action': label.get('action', event.get('action'))}
+
+    def _flush(self, key):
+        """ Sends merged events of the repository to workers. """
+        pending = self._collecting.pop(key)
+        event = {'repository': key[1], 'action': None, 'labels': list(pending['labels'].values())}
+        self._queue.put_nowait((pending['service'], pending['event_ids'], event))
+
+    async def _worker(self):
+        while True:
+            service, event_ids, event = await self._queue.get()
+            try:
+                if not await service.handle_event(event, self.rules()):
+                    logger.error(f'Labels of {service.name} {event["repository"]} were not fixed')
+            except Exception as e:
+                logger.error(f'Webhook event of {service.name} {event["repository"]} failed: {e}')
+            # Cancelled worker leaves its events in durable queue for the next start
+            self._forget(event_ids)
+            self._queue.task_done()
+
+    async def join(self):
+        """ Waits until all enqueued events are processed. """
+        while self._collecting:
+            await asyncio.sleep(self.window / 2 or 0.01)
+        await self._queue.join()
+
+    async def stop(self):
+        """ Stops workers. Events left in durable queue are processed after restart. """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'pending': self._queue.qsize() if self._queue else 0,
+            'collecting': len(self._collecting),
+            'merged': self.merged,
+            'dropped_echoes': self.dropped,
+            'durable': self._db is not None
+        }
+
+    @classmethod
+    def load(cls, cfg):
+        """ Loads queue settings from 'webhooks' section of configuration. """
+        return WebhookQueue(
+            workers=cfg.getint('webhooks', 'workers', fallback=4),
+            path=cfg.get('webhooks', 'queue', fallback=None),
+            window=cfg.getfloat('webhooks', 'window', fallback=2.0),
+            echo_ttl=cfg.getint('webhooks', 'echo_ttl', fallback=60)
+        )
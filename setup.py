@@ -21,7 +21,7 @@ setup(
     author_email='fedotovdanil570@gmail.com',
     keywords='git, github, gitlab, label, labels, repository, api',
     url='https://github.com/fedotovdanil570/labelatory',
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks']),
     package_data={
         'labelatory': ['templates/*.html'],
     },
@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+from labelatory.connector import GitHubConnector, GitLabConnector, Response
+from labelatory.errors import NotFoundError, RateLimitError
+from labelatory.pool import ConnectionPool
+from benchmarks.fakeapi import FakeAPI
+
+
+HEADERS = {'User-Agent': 'Labelatory'}
+
+
+class RecordingAPI(FakeAPI):
+    """ Fake API which remembers conditional headers of the requests. """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.conditional = []
+
+    async def handle(self, request):
+        self.conditional.append(request.headers.get('If-None-Match'))
+        return await super().handle(request)
+
+
+def _run(fake, scenario):
+    """ Runs scenario(url, session) against the fake API. """
+    async def main():
+        url = await fake.start()
+        pool = ConnectionPool()
+        try:
+            return await scenario(url, pool.session(HEADERS))
+        finally:
+            await pool.close()
+            await fake.stop()
+    return asyncio.run(main())
+
+
+def _github(url, session):
+    connector = GitHubConnector('token', session=session)
+    connector.API_ENDPOINT = url + '/'
+    return connector
+
+
+def test_pages_are_fetched_concurrently_in_order():
+    fake = FakeAPI(repos=1, labels=250)
+    expected = [f'label{j}' for j in range(250)]
+
+    async def scenario(url, session):
+        github = _github(url, session)
+        gitlab = GitLabConnector('127.0.0.1', 'token', session=session)
+        gitlab.api_url = url + '/api/v4'
+        return await github.get_labels('org/repo0'), await gitlab.get_labels('org/repo0')
+
+    github_labels, gitlab_labels = _run(fake, scenario)
+    assert [label.name for label in github_labels] == expected
+    assert [label.name for label in gitlab_labels] == expected
+    # First page tells the number of pages, the other two are requested at once
+    assert fake.requests['GET'] == 6
+
+
+def test_next_links_are_followed_without_number_of_pages():
+    class NextLinksOnly(GitHubConnector):
+        @staticmethod
+        def _total_pages(resp):
+            return None
+
+    fake = FakeAPI(repos=1, labels=250)
+
+    async def scenario(url, session):
+        connector = NextLinksOnly('token', session=session)
+        connector.API_ENDPOINT = url + '/'
+        return await connector.get_labels('org/repo0')
+
+    labels = _run(fake, scenario)
+    assert [label.name for label in labels] == [f'label{j}' for j in range(250)]
+    assert fake.requests['GET'] == 3
+
+
+def test_unchanged_labels_are_revalidated_with_etag():
+    fake = RecordingAPI(repos=1, labels=5)
+
+    async def scenario(url, session):
+        connector = _github(url, session)
+        first = await connector.get_labels('org/repo0')
+        hits = connector.cache.hits
+        second = await connector.get_labels('org/repo0')
+        return first, second, connector.cache.hits - hits
+
+    first, second, hits = _run(fake, scenario)
+    assert second == first
+    assert hits == 1
+    assert fake.conditional[0] is None and fake.conditional[1] is not None
+
+
+def test_bulk_labels_follow_cursors_per_repository():
+    fake = FakeAPI(repos=2, labels=150)
+    for name in list(fake.repos['org/repo1'])[3:]:
+        del fake.repos['org/repo1'][name]
+
+    async def scenario(url, session):
+        return await _github(url, session).get_labels_bulk(['org/repo0', 'org/repo1', 'org/missing'])
+
+    results = _run(fake, scenario)
+    assert [label.name for label in results['org/repo0']] == [f'label{j}' for j in range(150)]
+    assert [label.name for label in results['org/repo1']] == ['label0', 'label1', 'label2']
+    assert isinstance(results['org/missing'], NotFoundError)
+    # Second query asks only for the repository with more labels
+    assert fake.requests['POST'] == 2
+
+
+def test_bulk_queries_are_sent_few_at_a_time():
+    class CountingConnector(GitHubConnector):
+        GRAPHQL_BATCH = 1
+        running = peak = 0
+
+        async def _get_labels_batch(self, reposlugs):
+            CountingConnector.running += 1
+            CountingConnector.peak = max(CountingConnector.peak, CountingConnector.running)
+            await asyncio.sleep(0.01)
+            CountingConnector.running -= 1
+            return {reposlug: [] for reposlug in reposlugs}
+
+    asyncio.run(CountingConnector('token').get_labels_bulk([f'org/repo{i}' for i in range(10)]))
+    assert CountingConnector.peak == CountingConnector.GRAPHQL_CONCURRENCY
+
+
+def test_failed_graphql_query_raises_instead_of_reporting_missing_repos():
+    class RateLimitedConnector(GitHubConnector):
+        async def _request(self, *args, **kwargs):
+            return Response(200, {}, {}, {'data': None, 'errors': [{'type': 'RATE_LIMITED', 'message': 'API rate limit exceeded'}]})
+
+    with pytest.raises(RateLimitError):
+        asyncio.run(RateLimitedConnector('token').get_labels_bulk(['org/a', 'org/b']))
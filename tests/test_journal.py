@@ -0,0 +1,79 @@
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from labelatory.journal import FixJournal, FixRun, RunInProgressError
+from labelatory.label import Label
+from labelatory.plan import Operation
+
+
+class FakeService():
+    name = 'github'
+    repos = {'org/a': True, 'org/b': True, 'org/c': False}
+
+
+def test_interrupted_run_resumes_with_remaining_repos(tmp_path):
+    service = FakeService()
+    journal = FixJournal(str(tmp_path / 'journal.db'))
+    run = FixRun(journal, journal.start([service]))
+    run.operation_done(service, 'org/a', Operation('create', Label('bug', 'd73a4a', 'Bug')))
+    run.repo_done(service, 'org/a', [True])
+    run.repo_done(service, 'org/b', Exception('Bad Gateway'))
+
+    # Journal is reopened after restart
+    journal = FixJournal(str(tmp_path / 'journal.db'))
+    assert journal.interrupted() == run.run_id
+    assert journal.done(run.run_id, 'github') == {'org/a'}
+    summary, = journal.runs()
+    assert (summary['done'], summary['failed'], summary['pending'], summary['operations']) == (1, 1, 0, 1)
+
+    journal.finish(run.run_id, failed=True)
+    # Completed run with failures is resumed only by its id
+    assert journal.interrupted() is None
+    assert journal.runs()[0]['status'] == 'failed'
+
+
+def test_old_interrupted_run_is_not_resumed(tmp_path):
+    journal = FixJournal(str(tmp_path / 'journal.db'), max_age=0)
+    journal.start([FakeService()])
+    assert journal.interrupted() is None
+
+
+def test_run_in_progress_is_not_resumed_concurrently(tmp_path):
+    path = str(tmp_path / 'journal.db')
+    journal = FixJournal(path)
+    run_id = journal.start([FakeService()])
+
+    # Second request sees live run neither as interrupted nor lets it start another one
+    assert journal.interrupted() is None
+    with pytest.raises(RunInProgressError):
+        journal.start([FakeService()])
+    with pytest.raises(RunInProgressError):
+        journal.resume(run_id)
+
+    journal.release(run_id)
+    assert journal.interrupted() == run_id
+    journal.resume(run_id)
+    assert journal.interrupted() is None
+
+
+def test_run_of_other_process_is_resumed_after_it_exits(tmp_path):
+    path = str(tmp_path / 'journal.db')
+    journal = FixJournal(path)
+    run_id = journal.start([FakeService()])
+    journal.release(run_id)
+
+    process = subprocess.Popen([sys.executable, '-c', 'import sys; sys.stdin.read()'], stdin=subprocess.PIPE)
+    db = sqlite3.connect(path)
+    db.execute('UPDATE runs SET owner = ? WHERE run_id = ?', (process.pid, run_id))
+    db.commit()
+    db.close()
+    try:
+        assert journal.interrupted() is None
+        with pytest.raises(RunInProgressError):
+            journal.start([FakeService()])
+    finally:
+        process.communicate()
+    assert journal.interrupted() == run_id
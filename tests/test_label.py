@@ -0,0 +1,23 @@
+import pickle
+
+import pytest
+
+from labelatory.label import Label, Violation
+
+
+def test_label_is_immutable():
+    label = Label('bug', 'd73a4a', 'Something isn\'t working')
+    with pytest.raises(AttributeError):
+        label.color = 'ffffff'
+    renamed = label.replace(name='defect')
+    assert (renamed.name, renamed._old_name, renamed.color) == ('defect', 'bug', 'd73a4a')
+    assert label.name == 'bug'
+
+
+def test_equal_labels_and_violations_are_interchangeable():
+    label = Label('bug', 'd73a4a', 'Something isn\'t working')
+    same = Label(''.join(['b', 'ug']), 'd73a4a', 'Something isn\'t working')
+    assert label == same and hash(label) == hash(same)
+    assert label.name is same.name
+    assert len({Violation('extra', label, 'bug'), Violation('extra', same, 'bug')}) == 1
+    assert pickle.loads(pickle.dumps(label)) == label
@@ -0,0 +1,101 @@
+import pytest
+
+from labelatory.label import Label
+from labelatory.labelatory import validate_plan
+from labelatory.plan import Operation, build_plan, plan_record
+from labelatory.rules import RuleIndex
+from labelatory.services import GitHubService, GitLabService
+
+
+RULES = {
+    'bug': Label('bug', '#d73a4a', 'Something isn\'t working'),
+    'enhancement': Label('enhancement', '#A2EEEF', 'New feature or request'),
+    'question': Label('question', 'd876e3', 'Further information is requested'),
+}
+
+
+def _plan(labels):
+    index = RuleIndex(RULES)
+    return [(op.type, op.old_name, op.label.name) for op in build_plan(index, index.evaluate(labels))]
+
+
+def test_color_and_description_are_fixed_by_one_update():
+    labels = [
+        Label('bug', 'ffffff', 'Something else'),
+        Label('enhancement', 'a2eeef', 'New feature or request'),
+        Label('question', 'd876e3', 'Further information is requested'),
+    ]
+    plan = build_plan(RULES, RuleIndex(RULES).evaluate(labels))
+    assert [(op.type, op.label.name) for op in plan] == [('update', 'bug')]
+    assert plan[0].label.color == '#d73a4a'
+    assert plan[0].label.description == 'Something isn\'t working'
+
+
+def test_similar_extra_label_is_renamed():
+    labels = [
+        Label('Bug', 'd73a4a', 'Something isn\'t working'),
+        Label('enhancements', 'a2eeef', 'New feature or request'),
+        Label('feature', 'a2eeef', 'New feature or request'),
+        Label('wontfix', 'ffffff', 'This will not be worked on'),
+    ]
+    assert _plan(labels) == [
+        ('rename', 'Bug', 'bug'),
+        ('rename', 'enhancements', 'enhancement'),
+        ('delete', 'feature', 'feature'),
+        ('delete', 'wontfix', 'wontfix'),
+        ('create', 'question', 'question'),
+    ]
+
+
+def test_unrelated_labels_with_same_color_are_not_renamed():
+    rules = {
+        'priority: high': Label('priority: high', '#ededed', None),
+        'docs': Label('docs', '#0075ca', None),
+    }
+    index = RuleIndex(rules)
+    labels = [Label('wontfix', 'ededed', None), Label('duplicate', '0075ca', None)]
+    plan = build_plan(index, index.evaluate(labels))
+    assert sorted((op.type, op.label.name) for op in plan) == [
+        ('create', 'docs'), ('create', 'priority: high'), ('delete', 'duplicate'), ('delete', 'wontfix')
+    ]
+
+
+def test_duplicate_violations_are_solved_once():
+    index = RuleIndex(RULES)
+    violations = index.evaluate([]) + index.evaluate([])
+    plan = build_plan(index, violations)
+    assert sorted(op.label.name for op in plan) == ['bug', 'enhancement', 'question']
+    assert {op.type for op in plan} == {'create'}
+
+
+def test_operations_survive_serialization():
+    index = RuleIndex(RULES)
+    plan = build_plan(index, index.evaluate([Label('Bug', 'd73a4a', 'Something isn\'t working')]))
+    loaded = [Operation.from_dict(op.to_dict()) for op in plan]
+    assert [op.to_dict() for op in loaded] == [op.to_dict() for op in plan]
+    assert loaded[0].before.name == 'Bug'
+
+
+def test_only_plans_of_enabled_repositories_are_executed():
+    github = GitHubService('github', 'token', 'secret', {'org/a': True, 'org/b': False})
+    gitlab = GitLabService('gitlab', 'token', 'secret', {'group/a': True, 'other/b': False}, groups=['group', 'other'])
+    wontfix = Label('wontfix', 'ffffff', None)
+    delete = [Operation('delete', wontfix, before=wontfix)]
+    summary = {'service': 'github', 'summary': {'targets': 1}}
+
+    validate_plan([github, gitlab], [
+        plan_record('github', delete, repository='org/a'),
+        plan_record('gitlab', delete, group='group'),
+        summary
+    ])
+    for records in (
+        [plan_record('github', delete, repository='org/b')],
+        [plan_record('github', delete, repository='org/unknown')],
+        [plan_record('gitlab', delete, group='other')],
+        [plan_record('gitlab', delete, repository='group/a'), 1],
+        [plan_record('bitbucket', delete, repository='org/a')],
+        [dict(plan_record('github', delete, repository='org/a'), operations=[{'type': 'drop'}])],
+        [dict(plan_record('github', delete, repository='org/a'), operations=[{'type': 'delete', 'before': None}])],
+    ):
+        with pytest.raises(ValueError):
+            validate_plan([github, gitlab], records)
@@ -0,0 +1,47 @@
+import time
+import asyncio
+
+import pytest
+
+from labelatory.ratelimit import RateLimiter, WEBHOOK, BULK
+
+
+def test_webhook_requests_overtake_waiting_bulk_requests():
+    limiter = RateLimiter()
+    served = []
+
+    async def request(name, request_priority):
+        await limiter.acquire(request_priority)
+        served.append(name)
+
+    async def scenario():
+        await limiter.acquire()
+        # Budget is spent until the limit resets
+        limiter.update({'X-RateLimit-Limit': '100', 'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(int(time.time()) + 2)})
+        tasks = [asyncio.ensure_future(request(f'bulk{i}', BULK)) for i in range(3)]
+        await asyncio.sleep(0.01)
+        tasks.append(asyncio.ensure_future(request('webhook', WEBHOOK)))
+        await asyncio.sleep(0.01)
+        assert served == [] and limiter.stats()['waiting'] == 4
+        await asyncio.wait_for(asyncio.gather(*tasks), 4)
+
+    asyncio.run(scenario())
+    assert served == ['webhook', 'bulk0', 'bulk1', 'bulk2']
+    # Budget was full again after the reset
+    assert limiter.remaining == 96
+
+
+def test_requests_are_blocked_after_backoff():
+    limiter = RateLimiter(max_backoff=60)
+
+    async def scenario():
+        assert limiter.is_limited(429, {'Retry-After': '2'})
+        assert limiter.backoff({'Retry-After': '2'}, 0) == 2
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(limiter.acquire(), 0.2)
+        assert 1.5 < limiter.stats()['blocked_for'] <= 2
+
+    asyncio.run(scenario())
+    # Backoff without hints grows exponentially up to the maximum
+    assert limiter.backoff({}, 3) == 8
+    assert limiter.backoff({}, 10) == 60
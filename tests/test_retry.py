@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from labelatory.errors import from_status, NotFoundError, TransientError, CircuitOpenError
+from labelatory.retry import RetryPolicy, CircuitBreaker
+from labelatory.connector import GitHubConnector
+
+
+def test_only_safe_requests_are_retried():
+    policy = RetryPolicy(retries=2)
+    transient = from_status(502, 'Bad Gateway')
+    assert isinstance(transient, TransientError)
+    assert policy.should_retry('GET', transient, 0)
+    assert not policy.should_retry('GET', transient, 2)
+    assert not policy.should_retry('GET', from_status(404, 'Not Found'), 0)
+    assert not policy.should_retry('POST', transient, 0)
+    assert policy.should_retry('POST', transient, 0, sent=False)
+    assert policy.should_retry('POST', transient, 0, idempotent=True)
+    assert all(0 <= policy.delay(attempt) <= policy.base_delay * 2 ** attempt for attempt in range(5))
+
+
+def test_circuit_opens_after_failures_and_closes_after_trial():
+    breaker = CircuitBreaker('api.github.com', threshold=2, reset_timeout=0.05)
+    breaker.failure()
+    breaker.before_request()
+    breaker.failure()
+    assert breaker.state == 'open'
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    breaker._opened_at -= 0.05
+    assert breaker.state == 'half-open'
+    breaker.before_request()
+    # Only one trial request is let through
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    breaker.success()
+    assert breaker.state == 'closed'
+    assert isinstance(from_status(404, None), NotFoundError)
+
+
+def test_cancelled_trial_does_not_block_the_circuit():
+    class HangingConnector(GitHubConnector):
+        async def _send(self, *args, **kwargs):
+            await asyncio.sleep(10)
+
+    connector = HangingConnector('token', retry=RetryPolicy(circuit_threshold=1, circuit_reset=0))
+    breaker = connector._breaker('https://api.github.com/user/repos')
+    breaker.failure()
+
+    async def cancelled_trial():
+        task = asyncio.ensure_future(connector._request('GET', 'https://api.github.com/user/repos'))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancelled_trial())
+    assert breaker.state == 'half-open'
+    breaker.before_request()
+
@@ -0,0 +1,58 @@
+from labelatory.label import Label
+from labelatory.rules import RuleIndex, fingerprint
+
+
+RULES = {
+    'bug': Label('bug', '#d73a4a', 'Something isn\'t working'),
+    'enhancement': Label('enhancement', '#A2EEEF', 'New feature or request'),
+}
+
+
+def _types(violations):
+    return sorted((v.type, v.label.name) for v in violations)
+
+
+def test_conforming_labels_have_no_violations():
+    index = RuleIndex(RULES)
+    labels = [
+        Label('bug', 'd73a4a', 'Something isn\'t working'),
+        Label('enhancement', 'a2eeef', 'New feature or request'),
+    ]
+    assert index.evaluate(labels) == []
+
+
+def test_color_and_description_violations():
+    index = RuleIndex(RULES)
+    labels = [
+        Label('bug', 'ffffff', 'Something else'),
+        Label('enhancement', '#a2eeef', 'New feature or request'),
+    ]
+    assert _types(index.evaluate(labels)) == [('color', 'bug'), ('description', 'bug')]
+
+
+def test_extra_and_missing_labels():
+    index = RuleIndex(RULES)
+    labels = [Label('wontfix', 'ffffff', 'This will not be worked on')]
+    assert _types(index.evaluate(labels)) == [
+        ('extra', 'wontfix'),
+        ('missing', 'bug'),
+        ('missing', 'enhancement'),
+    ]
+
+
+def test_index_is_read_only_mapping():
+    index = RuleIndex(RULES)
+    assert RuleIndex.of(index) is index
+    assert index.get('bug') is RULES['bug']
+    assert 'wontfix' not in index
+    assert not hasattr(index, 'pop')
+
+
+def test_fingerprint_ignores_order_and_color_format():
+    labels = [
+        Label('enhancement', '#a2eeef', 'New feature or request'),
+        Label('bug', 'D73A4A', 'Something isn\'t working'),
+    ]
+    index = RuleIndex(RULES)
+    assert fingerprint(labels) == index.fingerprint
+    assert fingerprint(labels[:1]) != index.fingerprint
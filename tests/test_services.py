@@ -0,0 +1,155 @@
+from labelatory.connector import GitHubConnector, GitLabConnector, Response
+from labelatory.label import Label
+from labelatory.services import GitHubService, GitLabService
+from labelatory.store import LabelStore
+
+
+RULES = {
+    'bug': Label('bug', 'd73a4a', 'Something isn\'t working'),
+    'enhancement': Label('enhancement', 'a2eeef', 'New feature or request'),
+}
+
+
+def _label(name, color, project=True):
+    return {'name': name, 'color': color, 'description': RULES[name].description if name in RULES else None,
+            'is_project_label': project}
+
+
+class StubConnector(GitLabConnector):
+    """ GitLab connector answering from label listings instead of the API. """
+
+    def __init__(self, listings):
+        super().__init__('gitlab.example.com', 'token')
+        self.listings = listings
+        self.writes = []
+
+    async def _request(self, method, url, expected=(200,), limiter=None, idempotent=None, **kwargs):
+        path = url[len(self.api_url):].replace('%2F', '/')
+        if method == 'GET':
+            return Response(200, {}, {}, self.listings[path])
+        self.writes.append((method, path))
+        return Response(201 if method == 'POST' else 200, {}, {}, kwargs.get('json'))
+
+
+def _service():
+    # Group labels are listed as inherited by the project, 'local' is defined by the project itself
+    connector = StubConnector({
+        '/groups/group/labels': [_label('bug', 'ffffff')],
+        '/projects/group/a/labels': [_label('bug', 'ffffff', project=False), _label('local', '000000')],
+        '/projects/other/b/labels': [_label('bug', 'd73a4a')],
+    })
+    repos = {'group/a': True, 'other/b': True}
+    return GitLabService('gitlab', 'token', 'secret', repos, connector=connector, groups=['group']), connector
+
+
+GROUP_WRITES = [('PUT', '/groups/group/labels/bug'), ('POST', '/groups/group/labels')]
+PROJECT_WRITES = [('DELETE', '/projects/group/a/labels/local'), ('POST', '/projects/other/b/labels')]
+
+
+def test_inherited_and_missing_labels_are_fixed_on_managed_group():
+    service, connector = _service()
+
+    async def scenario():
+        _, checked_repos = await service.check_all(RULES)
+        return await service.fix_all(RULES, checked_repos)
+
+    _, results = service.run(scenario())
+    assert connector.writes[:2] == GROUP_WRITES
+    assert sorted(connector.writes[2:]) == PROJECT_WRITES
+    assert results == {'group': [True, True], 'group/a': [True], 'other/b': [True]}
+
+
+def test_plans_of_managed_group_come_before_projects():
+    service, connector = _service()
+    _, records = service.run(service.plan_all(RULES))
+
+    assert records[0]['group'] == 'group'
+    operations = {
+        record.get('group', record.get('repository')): [operation['type'] for operation in record['operations']]
+        for record in records
+    }
+    assert operations == {'group': ['update', 'create'], 'group/a': ['delete'], 'other/b': ['create']}
+    assert connector.writes == []
+
+
+def test_webhook_fixes_inherited_labels_on_group_and_local_ones_on_project():
+    service, connector = _service()
+    event = {
+        'repository': 'group/a',
+        'action': None,
+        'labels': [
+            {'name': 'bug', 'color': 'ffffff', 'description': RULES['bug'].description, 'inherited': True},
+            {'name': 'local', 'color': '000000', 'description': None, 'inherited': False},
+        ]
+    }
+    assert service.run(service.handle_event(event, RULES))
+    assert sorted(connector.writes) == sorted([GROUP_WRITES[0], PROJECT_WRITES[0]])
+
+    # Deleted label of the rules is restored on the group
+    connector.writes.clear()
+    event = {'repository': 'group/a', 'action': 'deleted', 'labels': [dict(event['labels'][0], color='d73a4a')]}
+    assert service.run(service.handle_event(event, RULES))
+    assert connector.writes == [GROUP_WRITES[1]]
+
+
+class CountingConnector(GitHubConnector):
+    """ GitHub connector counting repositories whose labels are fetched. """
+
+    def __init__(self, labels):
+        super().__init__('token')
+        self.labels = labels
+        self.fetched = []
+
+    async def get_labels(self, reposlug):
+        self.fetched.append(reposlug)
+        return list(self.labels[reposlug])
+
+    async def update_label(self, reposlug, label):
+        self.labels[reposlug] = [label if old.name == label._old_name else old for old in self.labels[reposlug]]
+        return label
+
+
+def _stored_service(tmp_path):
+    connector = CountingConnector({
+        'org/a': list(RULES.values()),
+        'org/b': [Label('bug', 'ffffff', RULES['bug'].description), RULES['enhancement']],
+    })
+    service = GitHubService('github', 'token', 'secret', {'org/a': True, 'org/b': True}, connector=connector)
+    service.store = LabelStore(str(tmp_path / 'store.db'))
+    return service, connector
+
+
+def test_incremental_check_fetches_only_dirty_repositories(tmp_path):
+    service, connector = _stored_service(tmp_path)
+    service.run(service.check_all(RULES))
+    assert sorted(connector.fetched) == ['org/a', 'org/b']
+
+    connector.fetched.clear()
+    _, results = service.run(service.check_all(RULES, incremental=True))
+    assert connector.fetched == []
+    assert results['org/a'] == [] and [violation.type for violation in results['org/b']] == ['color']
+
+    # Webhook event flagged the repository
+    service.store.mark_dirty('github', 'org/a')
+    service.run(service.check_all(RULES, incremental=True))
+    assert connector.fetched == ['org/a']
+
+
+def test_compliant_repository_is_skipped_by_fingerprint(tmp_path):
+    service, connector = _stored_service(tmp_path)
+    _, checked_repos = service.run(service.check_all(RULES))
+    service.run(service.fix_all(RULES, checked_repos))
+
+    loaded = []
+    load_labels = service.store.load_labels
+    def _load_labels(name, reposlug):
+        loaded.append(reposlug)
+        return load_labels(name, reposlug)
+    service.store.load_labels = _load_labels
+
+    connector.fetched.clear()
+    _, results = service.run(service.check_all(RULES, incremental=True))
+    assert results == {'org/a': [], 'org/b': []}
+    assert connector.fetched == []
+    # Fixed repository is evaluated from stored labels, the compliant one only by its fingerprint
+    assert loaded == ['org/b']
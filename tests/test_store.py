@@ -0,0 +1,27 @@
+import sqlite3
+
+from labelatory.label import Label
+from labelatory.store import LabelStore
+
+
+def test_inherited_labels_survive_the_store(tmp_path):
+    store = LabelStore(str(tmp_path / 'store.db'))
+    store.save_labels('gitlab', 'grp/p', [Label('bug', 'd73a4a', 'Bug', inherited=True), Label('docs', '0075ca', None)])
+    labels = {label.name: label.inherited for label in store.load_labels('gitlab', 'grp/p')}
+    assert labels == {'bug': True, 'docs': False}
+
+
+def test_store_without_inherited_column_is_migrated(tmp_path):
+    path = str(tmp_path / 'store.db')
+    db = sqlite3.connect(path)
+    db.executescript('''
+        CREATE TABLE repos (service TEXT, reposlug TEXT, checked_at REAL, dirty INTEGER NOT NULL DEFAULT 0,
+            fingerprint TEXT, PRIMARY KEY (service, reposlug));
+        CREATE TABLE labels (service TEXT, reposlug TEXT, name TEXT, color TEXT, description TEXT,
+            PRIMARY KEY (service, reposlug, name));
+        INSERT INTO repos VALUES ('gitlab', 'grp/p', strftime('%s', 'now'), 0, NULL);
+    ''')
+    db.close()
+    store = LabelStore(path)
+    # Labels stored without knowing which are inherited are fetched again
+    assert not store.is_fresh('gitlab', 'grp/p')
@@ -0,0 +1,43 @@
+import asyncio
+
+from labelatory.tracing import Tracer
+
+
+class ListExporter():
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+    def close(self):
+        pass
+
+
+def test_spans_of_concurrent_tasks_have_common_parent():
+    tracer = Tracer(ListExporter())
+
+    async def check(reposlug):
+        with tracer.span('check_repo', repository=reposlug):
+            with tracer.span('http'):
+                await asyncio.sleep(0)
+
+    async def check_all():
+        with tracer.span('check_all'):
+            await asyncio.gather(check('org/a'), check('org/b'))
+
+    asyncio.run(check_all())
+    spans = {span.name + span.lane: span for span in tracer.exporter.spans}
+    root = [span for span in tracer.exporter.spans if span.name == 'check_all'][0]
+    assert root.parent_id is None
+    assert spans['check_repoorg/a'].parent_id == root.span_id
+    assert spans['httporg/b'].parent_id == spans['check_repoorg/b'].span_id
+    assert len({span.trace_id for span in tracer.exporter.spans}) == 1
+
+
+def test_not_sampled_trace_records_nothing():
+    tracer = Tracer(ListExporter(), sample=0)
+    with tracer.span('check_all'):
+        with tracer.span('http'):
+            pass
+    assert tracer.exporter.spans == []
@@ -0,0 +1,78 @@
+import json
+import sqlite3
+
+import pytest
+
+from labelatory.label import Label
+from labelatory.loop import BackgroundLoop
+from labelatory.webhooks import WebhookQueue
+
+
+class StubService():
+    name = 'github'
+
+    def __init__(self):
+        self.events = []
+
+    async def handle_event(self, event, labels_rules):
+        self.events.append(event)
+        return True
+
+
+@pytest.fixture
+def loop():
+    loop = BackgroundLoop('labelatory-test')
+    yield loop
+    loop.stop()
+
+
+def _event(name, color='d73a4a', action='edited', repository='org/repo'):
+    return {'repository': repository, 'action': action, 'labels': [{'name': name, 'color': color, 'description': None}]}
+
+
+def test_events_of_repository_in_one_window_are_merged(loop):
+    service = StubService()
+    queue = WebhookQueue(workers=2, window=0.2)
+    queue.start(loop, [service], lambda: {})
+    for color in ('000000', '111111', 'ffffff'):
+        queue.put(service, _event('bug', color))
+    queue.put(service, _event('docs', action='deleted'))
+    loop.run(queue.join())
+    loop.run(queue.stop())
+
+    event, = service.events
+    labels = {label['name']: (label['color'], label['action']) for label in event['labels']}
+    assert labels == {'bug': ('ffffff', 'edited'), 'docs': ('d73a4a', 'deleted')}
+    assert queue.stats()['merged'] == 3
+
+
+def test_echo_of_own_write_is_dropped(loop):
+    service = StubService()
+    queue = WebhookQueue(window=0)
+    queue.start(loop, [service], lambda: {})
+    queue.writes.remember('github', 'org/repo', Label('bug', '#D73A4A', None), 'edited')
+    queue.put(service, _event('bug', 'd73a4a'))
+    loop.run(queue.join())
+    loop.run(queue.stop())
+
+    assert service.events == []
+    assert queue.stats()['dropped_echoes'] == 1
+
+
+def test_pending_events_are_replayed_after_restart(loop, tmp_path):
+    path = str(tmp_path / 'webhooks.db')
+    WebhookQueue(path=path)
+    db = sqlite3.connect(path)
+    db.execute('INSERT INTO events (service, event) VALUES (?, ?)', ('github', json.dumps(_event('bug'))))
+    db.commit()
+    db.close()
+
+    service = StubService()
+    queue = WebhookQueue(path=path, window=0)
+    queue.start(loop, [service], lambda: {})
+    loop.run(queue.join())
+    loop.run(queue.stop())
+
+    assert [event['repository'] for event in service.events] == ['org/repo']
+    # Processed event is removed from durable queue
+    assert queue._pending() == []